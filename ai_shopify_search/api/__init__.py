@@ -8,8 +8,8 @@ Contains API-related components:
 - API routes and endpoints
 """
 
-from .error_handlers import error_handler_middleware
+from .error_handlers import register_exception_handlers
 
 __all__ = [
-    'error_handler_middleware'
+    'register_exception_handlers'
 ] 
\ No newline at end of file
@@ -1,14 +1,22 @@
 import logging
-import traceback
+import threading
+from datetime import date
+from functools import lru_cache
 from typing import Dict, Any, Optional
-from fastapi import HTTPException, Request, status
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Request, status
+from fastapi.responses import Response
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError, OperationalError
 from redis.exceptions import RedisError
 import psycopg2
 
+from ai_shopify_search.utils.error_handling import ErrorCategory, category_from_notes
+from ai_shopify_search.utils.json_utils import json_bytes, json_log
+
 logger = logging.getLogger(__name__)
 
+# Reusable log_error context dict per thread
+_log_context = threading.local()
+
 class SearchAPIException(HTTPException):
     """Custom exception for search API errors."""
     def __init__(
@@ -67,163 +75,182 @@ class ValidationError(SearchAPIException):
             error_code="VALIDATION_ERROR"
         )
 
-def log_error(error: Exception, context: Dict[str, Any] = None):
-    """Log error with context."""
-    error_context = context or {}
-    error_context.update({
-        "error_type": type(error).__name__,
-        "error_message": str(error),
-        "traceback": traceback.format_exc()
-    })
+def log_error(error: Exception, context: Dict[str, Any] = None, category: Optional[ErrorCategory] = None):
+    """Log error with context (and the handle_errors category, if known)."""
+    # Skip building the payload entirely when ERROR records are filtered out
+    if not logger.isEnabledFor(logging.ERROR):
+        return
+    
+    # Per-thread scratch dict, cleared and reused; it is serialized before logger.error returns.
+    # Copying into it also keeps the caller's context (echoed in the response body) untouched.
+    error_context = getattr(_log_context, "ctx", None)
+    if error_context is None:
+        error_context = _log_context.ctx = {}
+    error_context.clear()
+    if context:
+        error_context.update(context)
+    error_context["error_type"] = type(error).__name__
+    error_context["error_message"] = str(error)
+    if category is not None:
+        error_context["error_category"] = category.value
     
-    logger.error(f"API Error: {error_context}")
+    # Traceback is formatted by the handler (and cached on the record) only if it renders exc_info
+    logger.error("API Error: %s", json_log(error_context), exc_info=error)
+
+# Error response bodies only differ in "context" (and "detail" for validation/rate limit errors):
+# the constant JSON is serialized once here and the variable parts are spliced in per response.
+def _body_prefix(**fields: Any) -> bytes:
+    """Serialize an error body template whose last field is None, leaving that value open."""
+    return json_bytes(fields)[:-len(b"null}")]
+
+_DB_CONNECTION_PREFIX = _body_prefix(error="Database connection error", error_code="DB_CONNECTION_ERROR", detail="Database is temporarily unavailable", context=None)
+_DB_INTEGRITY_PREFIX = _body_prefix(error="Data integrity error", error_code="DB_INTEGRITY_ERROR", detail="Invalid data provided", context=None)
+_DB_ERROR_PREFIX = _body_prefix(error="Database error", error_code="DB_ERROR", detail="An unexpected database error occurred", context=None)
+_CACHE_ERROR_PREFIX = _body_prefix(error="Cache error", error_code="CACHE_ERROR", detail="Cache service is temporarily unavailable", context=None)
+_EMBEDDING_ERROR_PREFIX = _body_prefix(error="Embedding generation error", error_code="EMBEDDING_ERROR", detail="Failed to generate search embeddings", context=None)
+_INTERNAL_ERROR_PREFIX = _body_prefix(error="Internal server error", error_code="INTERNAL_ERROR", detail="An unexpected error occurred", context=None)
+_VALIDATION_ERROR_PREFIX = _body_prefix(error="Validation error", error_code="VALIDATION_ERROR", detail=None)
+_RATE_LIMIT_PREFIX = _body_prefix(error="Rate limit exceeded", error_code="RATE_LIMIT_EXCEEDED", detail=None)
+_CONTEXT_KEY = b',"context":'
+_SUFFIX = b'}'
 
-def handle_database_error(error: SQLAlchemyError, context: Dict[str, Any] = None) -> JSONResponse:
+def _error_response(status_code: int, prefix: bytes, context: Optional[Dict[str, Any]], detail: Any = None, has_detail: bool = False) -> Response:
+    """Build an error response from a pre-serialized prefix."""
+    if has_detail:
+        body = prefix + json_bytes(detail) + _CONTEXT_KEY + json_bytes(context) + _SUFFIX
+    else:
+        body = prefix + json_bytes(context) + _SUFFIX
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+# (status_code, body prefix) per SQLAlchemy error type; subclasses resolve via _database_error_spec
+_DATABASE_ERROR_SPECS = {
+    OperationalError: (status.HTTP_503_SERVICE_UNAVAILABLE, _DB_CONNECTION_PREFIX),
+    IntegrityError: (status.HTTP_400_BAD_REQUEST, _DB_INTEGRITY_PREFIX),
+}
+
+@lru_cache(maxsize=128)
+def _database_error_spec(error_type: type) -> tuple:
+    """Response spec for a database error type (most specific class in the MRO wins)."""
+    for klass in error_type.__mro__:
+        spec = _DATABASE_ERROR_SPECS.get(klass)
+        if spec is not None:
+            return spec
+    return status.HTTP_500_INTERNAL_SERVER_ERROR, _DB_ERROR_PREFIX
+
+def handle_database_error(error: SQLAlchemyError, context: Dict[str, Any] = None) -> Response:
     """Handle database errors."""
     log_error(error, context)
     
-    if isinstance(error, OperationalError):
-        return JSONResponse(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            content={
-                "error": "Database connection error",
-                "error_code": "DB_CONNECTION_ERROR",
-                "detail": "Database is temporarily unavailable",
-                "context": context
-            }
-        )
-    elif isinstance(error, IntegrityError):
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            content={
-                "error": "Data integrity error",
-                "error_code": "DB_INTEGRITY_ERROR",
-                "detail": "Invalid data provided",
-                "context": context
-            }
-        )
-    else:
-        return JSONResponse(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            content={
-                "error": "Database error",
-                "error_code": "DB_ERROR",
-                "detail": "An unexpected database error occurred",
-                "context": context
-            }
-        )
+    status_code, prefix = _database_error_spec(type(error))
+    return _error_response(status_code, prefix, context)
 
-def handle_redis_error(error: RedisError, context: Dict[str, Any] = None) -> JSONResponse:
+def handle_redis_error(error: RedisError, context: Dict[str, Any] = None) -> Response:
     """Handle Redis errors."""
     log_error(error, context)
     
-    return JSONResponse(
-        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        content={
-            "error": "Cache error",
-            "error_code": "CACHE_ERROR",
-            "detail": "Cache service is temporarily unavailable",
-            "context": context
-        }
-    )
+    return _error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, _CACHE_ERROR_PREFIX, context)
 
-def handle_embedding_error(error: Exception, context: Dict[str, Any] = None) -> JSONResponse:
+def handle_embedding_error(error: Exception, context: Dict[str, Any] = None) -> Response:
     """Handle embedding generation errors."""
     log_error(error, context)
     
-    return JSONResponse(
-        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        content={
-            "error": "Embedding generation error",
-            "error_code": "EMBEDDING_ERROR",
-            "detail": "Failed to generate search embeddings",
-            "context": context
-        }
-    )
+    return _error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, _EMBEDDING_ERROR_PREFIX, context)
 
-def handle_validation_error(error: Exception, context: Dict[str, Any] = None) -> JSONResponse:
+def handle_validation_error(error: Exception, context: Dict[str, Any] = None) -> Response:
     """Handle validation errors."""
     log_error(error, context)
     
-    return JSONResponse(
-        status_code=status.HTTP_400_BAD_REQUEST,
-        content={
-            "error": "Validation error",
-            "error_code": "VALIDATION_ERROR",
-            "detail": str(error),
-            "context": context
-        }
+    return _error_response(
+        status.HTTP_400_BAD_REQUEST, _VALIDATION_ERROR_PREFIX, context,
+        # str() of an HTTPException prefixes the status code ("400: ...")
+        detail=getattr(error, "detail", None) or str(error), has_detail=True
     )
 
-def handle_rate_limit_error(error: RateLimitExceededError, context: Dict[str, Any] = None) -> JSONResponse:
+def handle_rate_limit_error(error: RateLimitExceededError, context: Dict[str, Any] = None) -> Response:
     """Handle rate limit errors."""
     log_error(error, context)
     
-    return JSONResponse(
-        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-        content={
-            "error": "Rate limit exceeded",
-            "error_code": "RATE_LIMIT_EXCEEDED",
-            "detail": error.detail,
-            "context": context
-        }
+    return _error_response(
+        status.HTTP_429_TOO_MANY_REQUESTS, _RATE_LIMIT_PREFIX, context,
+        detail=error.detail, has_detail=True
     )
 
-def handle_generic_error(error: Exception, context: Dict[str, Any] = None) -> JSONResponse:
+def handle_generic_error(error: Exception, context: Dict[str, Any] = None) -> Response:
     """Handle generic errors."""
-    log_error(error, context)
+    # Plain exceptions that passed through handle_errors carry their category as a note
+    log_error(error, context, category_from_notes(error))
     
-    return JSONResponse(
-        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        content={
-            "error": "Internal server error",
-            "error_code": "INTERNAL_ERROR",
-            "detail": "An unexpected error occurred",
-            "context": context
-        }
-    )
+    return _error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, _INTERNAL_ERROR_PREFIX, context)
 
-async def error_handler_middleware(request: Request, call_next):
-    """Middleware for handling errors."""
-    try:
-        response = await call_next(request)
-        return response
-    except SearchAPIException as e:
-        # Handle custom exceptions
-        if isinstance(e, RateLimitExceededError):
-            return handle_rate_limit_error(e, {"endpoint": request.url.path})
-        elif isinstance(e, ValidationError):
-            return handle_validation_error(e, {"endpoint": request.url.path})
-        else:
-            return handle_generic_error(e, {"endpoint": request.url.path})
-    except SQLAlchemyError as e:
-        return handle_database_error(e, {"endpoint": request.url.path})
-    except RedisError as e:
-        return handle_redis_error(e, {"endpoint": request.url.path})
-    except Exception as e:
-        return handle_generic_error(e, {"endpoint": request.url.path})
+# Handler per exception type; anything unlisted falls through to handle_generic_error
+_EXCEPTION_HANDLERS = {
+    RateLimitExceededError: handle_rate_limit_error,
+    ValidationError: handle_validation_error,
+    SearchAPIException: handle_generic_error,
+    SQLAlchemyError: handle_database_error,
+    RedisError: handle_redis_error,
+}
+
+@lru_cache(maxsize=128)
+def _exception_handler_for(error_type: type):
+    """Handler for an exception type (most specific class in the MRO wins)."""
+    for klass in error_type.__mro__:
+        handler = _EXCEPTION_HANDLERS.get(klass)
+        if handler is not None:
+            return handler
+    return handle_generic_error
+
+async def _exception_handler(request: Request, exc: Exception) -> Response:
+    """FastAPI exception handler: render the error response for exc."""
+    # scope["path"] is a plain str; request.url would build a URL object
+    return _exception_handler_for(type(exc))(exc, {"endpoint": request.scope["path"]})
+
+def register_exception_handlers(app: FastAPI) -> None:
+    """
+    Install the error responses as FastAPI exception handlers.
+    
+    Starlette only invokes these when something raises, so successful requests
+    pay nothing (unlike a middleware wrapping every request).
+    """
+    for exc_type in (SearchAPIException, SQLAlchemyError, RedisError, Exception):
+        app.add_exception_handler(exc_type, _exception_handler)
+
+# Message per failed check, keyed by the check's bit; the lowest set bit is reported
+_SEARCH_PARAMETER_ERRORS = {
+    1: "Search query cannot be empty",
+    2: "Search query must be at least 2 characters long",
+    4: "Page number must be greater than 0",
+    8: "Limit must be between 1 and 100",
+}
 
 def validate_search_parameters(query: str, page: int, limit: int) -> None:
     """Validate search parameters."""
-    if not query or not query.strip():
-        raise ValidationError("Search query cannot be empty")
-    
-    if len(query.strip()) < 2:
-        raise ValidationError("Search query must be at least 2 characters long")
-    
-    if page < 1:
-        raise ValidationError("Page number must be greater than 0")
-    
-    if limit < 1 or limit > 100:
-        raise ValidationError("Limit must be between 1 and 100")
+    query_length = len(query.strip()) if query else 0
+    failed = (
+        (query_length == 0)
+        | (query_length < 2) << 1
+        | (page < 1) << 2
+        | (not 1 <= limit <= 100) << 3
+    )
+    if failed:
+        raise ValidationError(_SEARCH_PARAMETER_ERRORS[failed & -failed])
 
-def validate_analytics_parameters(start_date: str, end_date: str) -> None:
-    """Validate analytics parameters."""
+def _is_ymd(value: str) -> bool:
+    """True for a valid YYYY-MM-DD date (shape check first, no strptime format parsing)."""
+    if not (
+        len(value) == 10 and value[4] == "-" and value[7] == "-"
+        and value[:4].isdigit() and value[5:7].isdigit() and value[8:].isdigit()
+    ):
+        return False
     try:
-        from datetime import datetime
-        datetime.strptime(start_date, "%Y-%m-%d")
-        datetime.strptime(end_date, "%Y-%m-%d")
+        date(int(value[:4]), int(value[5:7]), int(value[8:]))
     except ValueError:
+        return False
+    return True
+
+def validate_analytics_parameters(start_date: str, end_date: str) -> None:
+    """Validate analytics parameters."""
+    if not (_is_ymd(start_date) and _is_ymd(end_date)):
         raise ValidationError("Invalid date format. Use YYYY-MM-DD")
 
 def safe_database_operation(operation, context: Dict[str, Any] = None):
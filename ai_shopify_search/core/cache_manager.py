@@ -2,7 +2,7 @@ import logging
 import json
 import hashlib
 import redis
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from .config import REDIS_HOST, REDIS_PORT, REDIS_DB, REDIS_PASSWORD, CACHE_TTL, SEARCH_CACHE_TTL, AI_SEARCH_CACHE_TTL
 
 logger = logging.getLogger(__name__)
@@ -18,6 +18,14 @@ class CacheManager:
             password=REDIS_PASSWORD,
             decode_responses=True
         )
+        # Separate client for raw binary payloads (e.g. float32 embeddings)
+        self.binary_client = redis.Redis(
+            host=REDIS_HOST, 
+            port=REDIS_PORT, 
+            db=REDIS_DB, 
+            password=REDIS_PASSWORD,
+            decode_responses=False
+        )
     
     def get_cache_key(self, prefix: str, **kwargs) -> str:
         """Generate a unique cache key based on parameters."""
@@ -40,6 +48,43 @@ class CacheManager:
         except Exception as e:
             logger.warning(f"Cache set error: {e}")
     
+    def get_cached_bytes(self, cache_key: str) -> Optional[bytes]:
+        """Retrieve a raw binary value from cache."""
+        try:
+            return self.binary_client.get(cache_key)
+        except Exception as e:
+            logger.warning(f"Cache error: {e}")
+            return None
+    
+    def set_cached_bytes(self, cache_key: str, data: bytes, ttl: int = CACHE_TTL) -> None:
+        """Store a raw binary value in cache."""
+        try:
+            self.binary_client.setex(cache_key, ttl, data)
+        except Exception as e:
+            logger.warning(f"Cache set error: {e}")
+    
+    def get_cached_bytes_many(self, cache_keys: List[str]) -> List[Optional[bytes]]:
+        """Retrieve raw binary values for several keys in one MGET round trip."""
+        if not cache_keys:
+            return []
+        try:
+            return self.binary_client.mget(cache_keys)
+        except Exception as e:
+            logger.warning(f"Cache error: {e}")
+            return [None] * len(cache_keys)
+    
+    def set_cached_bytes_many(self, items: Dict[str, bytes], ttl: int = CACHE_TTL) -> None:
+        """Store several raw binary values in one pipelined round trip."""
+        if not items:
+            return
+        try:
+            pipe = self.binary_client.pipeline(transaction=False)
+            for cache_key, data in items.items():
+                pipe.setex(cache_key, ttl, data)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Cache set error: {e}")
+    
     def invalidate_product_cache(self) -> None:
         """Invalidate all product-related cache."""
         try:
@@ -10,6 +10,8 @@ load_dotenv(env_path)
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://localhost/findly")
 DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", 10))
 DATABASE_MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", 20))
+DATABASE_APPLICATION_NAME = os.getenv("DATABASE_APPLICATION_NAME", "findly-api")  # Zichtbaar in pg_stat_statements/pg_stat_activity
+DATABASE_PREPARE_THRESHOLD = int(os.getenv("DATABASE_PREPARE_THRESHOLD", 5))  # psycopg3: server-side prepare na N uitvoeringen
 
 # Redis configuratie
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
@@ -21,6 +23,7 @@ REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", None)
 CACHE_TTL = int(os.getenv("CACHE_TTL", 3600))  # 1 uur default
 SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", 1800))  # 30 minuten voor zoeken
 AI_SEARCH_CACHE_TTL = int(os.getenv("AI_SEARCH_CACHE_TTL", 900))  # 15 minuten voor AI zoeken
+EMBEDDING_CACHE_TTL = int(os.getenv("EMBEDDING_CACHE_TTL", 30 * 24 * 3600))  # 30 dagen voor product embeddings
 
 # OpenAI configuratie
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
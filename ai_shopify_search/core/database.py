@@ -5,26 +5,66 @@ Database configuration and session management for Findly AI Search.
 
 import os
 import logging
-from typing import Optional
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
 from sqlalchemy import create_engine, text
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.engine import Connection, Engine
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
-from ai_shopify_search.core.config import DATABASE_URL
+from ai_shopify_search.core.config import (
+    DATABASE_URL,
+    DATABASE_POOL_SIZE,
+    DATABASE_MAX_OVERFLOW,
+    DATABASE_APPLICATION_NAME,
+    DATABASE_PREPARE_THRESHOLD
+)
+from ai_shopify_search.core.models import Base  # Single declarative base shared with all ORM models
 
 logger = logging.getLogger(__name__)
 
-# Base class for all models
-Base = declarative_base()
+def get_engine_options(database_url: str) -> Dict[str, Any]:
+    """
+    Build create_engine options for a database URL.
+    
+    PostgreSQL gets a persistent connection pool so connections (and their
+    server-side prepared statements) are reused across requests. Prepared
+    statements are per connection, so a PgBouncer in front must run in
+    session mode or have max_prepared_statements enabled.
+    
+    Args:
+        database_url: SQLAlchemy database URL
+        
+    Returns:
+        Keyword arguments for create_engine
+    """
+    options: Dict[str, Any] = {
+        "pool_pre_ping": True,
+        "pool_recycle": 300,
+        "echo": False  # Set to True for SQL debugging
+    }
+    
+    if not database_url.startswith("postgresql"):
+        options["poolclass"] = StaticPool
+        return options
+    
+    options["pool_size"] = DATABASE_POOL_SIZE
+    options["max_overflow"] = DATABASE_MAX_OVERFLOW
+    
+    connect_args: Dict[str, Any] = {"application_name": DATABASE_APPLICATION_NAME}
+    if database_url.startswith("postgresql+psycopg://"):
+        # psycopg3 auto-prepares statements after N executions on the same connection
+        connect_args["prepare_threshold"] = DATABASE_PREPARE_THRESHOLD
+    elif database_url.startswith("postgresql+asyncpg://"):
+        connect_args["statement_cache_size"] = 1024
+    options["connect_args"] = connect_args
+    
+    return options
 
 # Create engine with connection pooling
-engine = create_engine(
-    DATABASE_URL,
-    poolclass=StaticPool,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    echo=False  # Set to True for SQL debugging
-)
+engine = create_engine(DATABASE_URL, **get_engine_options(DATABASE_URL))
+
+# Store engines are cached per URL so their pools survive across requests
+_store_engines: Dict[str, Engine] = {}
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -78,14 +118,11 @@ def get_store_db(store_id: str):
     """
     store_db_url = get_store_database_url(store_id)
     
-    # Create a new engine for this store
-    store_engine = create_engine(
-        store_db_url,
-        poolclass=StaticPool,
-        pool_pre_ping=True,
-        pool_recycle=300,
-        echo=False
-    )
+    # Reuse the pooled engine for this store
+    store_engine = _store_engines.get(store_db_url)
+    if store_engine is None:
+        store_engine = create_engine(store_db_url, **get_engine_options(store_db_url))
+        _store_engines[store_db_url] = store_engine
     
     # Create session factory for this store
     StoreSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=store_engine)
@@ -96,6 +133,71 @@ def get_store_db(store_id: str):
     finally:
         db.close()
 
+# Monthly partitions kept ready ahead of the current month (pg_partman premakes more when installed)
+MONTHLY_PARTITIONS_AHEAD = 1
+
+def monthly_partition_ranges(today: date, months_ahead: int = MONTHLY_PARTITIONS_AHEAD) -> List[Tuple[str, date, date]]:
+    """
+    (name suffix, start, end) of the current month and the next months_ahead months.
+    
+    Args:
+        today: Date inside the first month
+        months_ahead: Number of following months
+        
+    Returns:
+        Ranges with an exclusive end, e.g. ("y2024m03", 2024-03-01, 2024-04-01)
+    """
+    ranges = []
+    year, month = today.year, today.month
+    for _ in range(months_ahead + 1):
+        next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+        ranges.append((f"y{year:04d}m{month:02d}", date(year, month, 1), date(next_year, next_month, 1)))
+        year, month = next_year, next_month
+    return ranges
+
+def ensure_monthly_partitions(conn: Connection, table_name: str, today: date) -> List[str]:
+    """
+    Create missing native monthly range partitions of a table partitioned by timestamp.
+    
+    Rows of a month that already landed in the DEFAULT partition are moved into
+    the new partition (PostgreSQL refuses to create the partition otherwise).
+    
+    Args:
+        conn: PostgreSQL connection (caller commits)
+        table_name: Partitioned parent table
+        today: Date inside the first month to create
+        
+    Returns:
+        Names of the partitions created
+    """
+    default_name = f"{table_name}_default"
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {default_name} PARTITION OF {table_name} DEFAULT"))
+    
+    created = []
+    for suffix, start, end in monthly_partition_ranges(today):
+        partition_name = f"{table_name}_{suffix}"
+        if conn.execute(text("SELECT to_regclass(:name)"), {"name": partition_name}).scalar() is not None:
+            continue
+        bounds = {"start": start, "end": end}
+        has_default_rows = conn.execute(
+            text(f"SELECT EXISTS (SELECT 1 FROM {default_name} WHERE timestamp >= :start AND timestamp < :end)"),
+            bounds
+        ).scalar()
+        if has_default_rows:
+            conn.execute(text(f"ALTER TABLE {table_name} DETACH PARTITION {default_name}"))
+        conn.execute(text(
+            f"CREATE TABLE {partition_name} PARTITION OF {table_name} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+        if has_default_rows:
+            conn.execute(text(
+                f"WITH moved AS (DELETE FROM {default_name} WHERE timestamp >= :start AND timestamp < :end RETURNING *) "
+                f"INSERT INTO {partition_name} SELECT * FROM moved"
+            ), bounds)
+            conn.execute(text(f"ALTER TABLE {table_name} ATTACH PARTITION {default_name} DEFAULT"))
+        created.append(partition_name)
+    return created
+
 # Create all tables
 def create_tables():
     """Create all database tables."""
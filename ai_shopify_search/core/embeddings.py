@@ -1,9 +1,15 @@
 import openai
-from .config import OPENAI_API_KEY
+from openai import AsyncOpenAI
+import httpx
+from .config import OPENAI_API_KEY, EMBEDDING_CACHE_TTL
+from .cache_manager import cache_manager
+import asyncio
 import re
 import hashlib
+import weakref
 import json
-from typing import List, Dict, Optional, Union
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple, Union
 from functools import lru_cache
 import logging
 import requests
@@ -20,6 +26,44 @@ logger = logging.getLogger(__name__)
 
 openai.api_key = OPENAI_API_KEY
 
+# Async OpenAI client: keep-alive pool zodat TLS handshakes gedeeld worden
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = 32
+OPENAI_MAX_CONCURRENT_REQUESTS = 16  # Blijf onder de rate limits
+
+# Semaphore en httpx pool zijn aan een event loop gebonden: per running loop aanmaken
+_loop_resources: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[asyncio.Semaphore, AsyncOpenAI]]" = weakref.WeakKeyDictionary()
+
+def _get_loop_resources() -> Tuple[asyncio.Semaphore, AsyncOpenAI]:
+    """Return the embedding semaphore and AsyncOpenAI client of the running event loop."""
+    loop = asyncio.get_running_loop()
+    resources = _loop_resources.get(loop)
+    if resources is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=OPENAI_MAX_CONCURRENT_REQUESTS * 2,
+                max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS
+            )
+        )
+        # Retries are handled by tenacity on the calling functions
+        client = AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=http_client, max_retries=0)
+        resources = (asyncio.Semaphore(OPENAI_MAX_CONCURRENT_REQUESTS), client)
+        _loop_resources[loop] = resources
+    return resources
+
+def get_embedding_semaphore() -> asyncio.Semaphore:
+    """Semaphore limiting concurrent OpenAI embedding requests on the running loop."""
+    return _get_loop_resources()[0]
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """Shared AsyncOpenAI client (keep-alive connection pool) of the running loop."""
+    return _get_loop_resources()[1]
+
+async def close_async_openai_client() -> None:
+    """Close the running loop's AsyncOpenAI client; call on application shutdown."""
+    resources = _loop_resources.pop(asyncio.get_running_loop(), None)
+    if resources is not None:
+        await resources[1].close()
+
 # OpenCLIP model initialization
 @lru_cache(maxsize=1)
 def get_clip_model():
@@ -235,9 +279,16 @@ def get_embedding_model(use_case: str = "product") -> str:
     else:
         return EMBEDDING_MODEL  # 1536d voor snelle query embeddings
 
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+
 def clean_description(html_text: str) -> str:
     """Verwijder HTML-tags uit de beschrijving."""
-    return re.sub(r"<[^>]+>", "", html_text or "").strip()
+    if not html_text:
+        return ""
+    # Platte tekst: geen regex pass nodig
+    if "<" not in html_text:
+        return html_text.strip()
+    return _HTML_TAG_RE.sub("", html_text).strip()
 
 def build_embedding_text(
     title: str,
@@ -421,11 +472,112 @@ def build_embedding_text(
     
     return combined_text
 
+# Velden die de embedding tekst bepalen (zie build_embedding_text)
+EMBEDDING_TEXT_FIELDS = (
+    "title", "description", "vendor", "product_type", "seo_title", "seo_description",
+    "product_attributes", "stock_status", "sku", "barcode", "status", "tags", "price",
+)
+
+def compute_embedding_fingerprint(
+    product_data: Dict,
+    image_url: Optional[str] = None,
+    store_id: str = None
+) -> str:
+    """
+    Content fingerprint of everything that feeds a product's stored embedding.
+    
+    Compared against Product.embedding_fingerprint during sync so unchanged
+    products skip build_embedding_text and the OpenAI call entirely.
+    """
+    canonical = json.dumps(
+        {
+            "model": get_embedding_model("product"),
+            "fields": {field: product_data.get(field) for field in EMBEDDING_TEXT_FIELDS},
+            "image_url": image_url,
+            "store_id": store_id,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
 def create_embedding_hash(text: str) -> str:
     """Creëer een hash voor caching van embeddings."""
     return hashlib.md5(text.encode('utf-8')).hexdigest()
 
-@lru_cache(maxsize=1000)
+# Query embeddings worden in-process gecached (herhaalde zoektermen)
+QUERY_EMBEDDING_CACHE_SIZE = 10000
+_query_embedding_cache: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+
+def _embedding_cache_key(model: str, text: str) -> str:
+    """Content-addressed Redis key for an embedding of text under model."""
+    digest = hashlib.blake2b(f"{model}|{text}".encode('utf-8'), digest_size=16).hexdigest()
+    return f"embedding:{digest}"
+
+def get_cached_product_embedding(text: str, model: str) -> Optional[List[float]]:
+    """Look up a product embedding stored as float32 bytes in Redis."""
+    cached = cache_manager.get_cached_bytes(_embedding_cache_key(model, text))
+    if not cached:
+        return None
+    return np.frombuffer(cached, dtype=np.float32).tolist()
+
+def store_product_embedding(text: str, model: str, embedding: List[float]) -> None:
+    """Store a product embedding in Redis as raw float32 bytes (~6 KB vs ~30 KB JSON)."""
+    cache_manager.set_cached_bytes(
+        _embedding_cache_key(model, text),
+        np.asarray(embedding, dtype=np.float32).tobytes(),
+        ttl=EMBEDDING_CACHE_TTL
+    )
+
+def get_cached_product_embeddings(texts: List[str], model: str) -> List[Optional[List[float]]]:
+    """Look up product embeddings for several texts with one MGET (None per miss)."""
+    cached = cache_manager.get_cached_bytes_many([_embedding_cache_key(model, text) for text in texts])
+    return [np.frombuffer(value, dtype=np.float32).tolist() if value else None for value in cached]
+
+def store_product_embeddings(texts: List[str], model: str, embeddings: List[List[float]]) -> None:
+    """Store several product embeddings as float32 bytes in one pipelined round trip."""
+    cache_manager.set_cached_bytes_many(
+        {
+            _embedding_cache_key(model, text): np.asarray(embedding, dtype=np.float32).tobytes()
+            for text, embedding in zip(texts, embeddings)
+        },
+        ttl=EMBEDDING_CACHE_TTL
+    )
+
+def _get_text_embedding(text: str, model: str, use_case: str) -> List[float]:
+    """Return the text embedding, consulting the product cache in Redis before calling OpenAI."""
+    if use_case == "query":
+        return generate_embedding_cached(text, model)
+    
+    embedding = get_cached_product_embedding(text, model)
+    if embedding is None:
+        embedding = generate_embedding_cached(text, model)
+        store_product_embedding(text, model, embedding)
+    return embedding
+
+async def _get_text_embedding_async(text: str, model: str, use_case: str) -> List[float]:
+    """Async counterpart of _get_text_embedding."""
+    if use_case == "query":
+        key = (model, text)
+        embedding = _query_embedding_cache.get(key)
+        if embedding is not None:
+            _query_embedding_cache.move_to_end(key)
+            return embedding
+        embedding = await generate_text_embedding_async(text, model)
+        _query_embedding_cache[key] = embedding
+        if len(_query_embedding_cache) > QUERY_EMBEDDING_CACHE_SIZE:
+            _query_embedding_cache.popitem(last=False)
+        return embedding
+    
+    embedding = get_cached_product_embedding(text, model)
+    if embedding is None:
+        embedding = await generate_text_embedding_async(text, model)
+        store_product_embedding(text, model, embedding)
+    return embedding
+
+@lru_cache(maxsize=QUERY_EMBEDDING_CACHE_SIZE)
 def generate_embedding_cached(text: str, model: str = None) -> List[float]:
     """
     Genereer embedding met caching voor identieke teksten.
@@ -451,6 +603,68 @@ def generate_embedding_cached(text: str, model: str = None) -> List[float]:
         logger.error(f"Error generating embedding: {e}")
         raise
 
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
+async def generate_text_embedding_async(text: str, model: str = None) -> List[float]:
+    """
+    Genereer embedding via de gedeelde AsyncOpenAI client.
+    
+    Args:
+        text: Tekst om te embedden
+        model: OpenAI model naam (optioneel)
+    
+    Returns:
+        Embedding vector
+    """
+    if not model:
+        model = get_embedding_model("query")
+    
+    async with get_embedding_semaphore():
+        response = await get_async_openai_client().embeddings.create(
+            model=model,
+            input=text
+        )
+    logger.info(f"Generated embedding for text (length: {len(text)}) with model {model}")
+    return response.data[0].embedding
+
+def _generate_optional_image_embedding(image_url: Optional[str]) -> Optional[List[float]]:
+    """Generate an image embedding, returning None when no URL is given or generation fails."""
+    if not image_url:
+        return None
+    try:
+        image_embedding = generate_image_embedding(image_url)
+        logger.info(f"Generated image embedding for {image_url}")
+        return image_embedding
+    except Exception as e:
+        logger.warning(f"Failed to generate image embedding for {image_url}: {e}")
+        return None
+
+def _assemble_embeddings(
+    text_embedding: List[float],
+    image_embedding: Optional[List[float]],
+    category: str = None,
+    store_id: str = None
+) -> Dict[str, Optional[List[float]]]:
+    """Combine text and image embeddings into the result dict returned by generate_embedding."""
+    combined_embedding = None
+    if text_embedding and image_embedding:
+        try:
+            combined_embedding = combine_embeddings(
+                text_embedding, 
+                image_embedding, 
+                category=category, 
+                store_id=store_id
+            )
+            logger.info("Generated combined text+image embedding")
+        except Exception as e:
+            logger.warning(f"Failed to generate combined embedding: {e}")
+            combined_embedding = text_embedding  # Fallback to text only
+    
+    return {
+        "text_embedding": text_embedding,
+        "image_embedding": image_embedding,
+        "combined_embedding": combined_embedding or text_embedding
+    }
+
 def generate_embedding(
     title: str = None,
     description: str = None,
@@ -536,37 +750,51 @@ def generate_embedding(
         )
         
         # Generate text embedding
-        text_embedding = generate_embedding_cached(embedding_text, get_embedding_model(use_case))
+        text_embedding = _get_text_embedding(embedding_text, get_embedding_model(use_case), use_case)
         
         # Generate image embedding if URL provided
+        image_embedding = _generate_optional_image_embedding(image_url)
+        
+        return _assemble_embeddings(text_embedding, image_embedding, category=category, store_id=store_id)
+        
+    except Exception as e:
+        logger.error(f"Error generating embeddings: {e}")
+        raise
+
+async def generate_embedding_async(
+    use_case: str = "product",
+    image_url: Optional[str] = None,
+    store_id: str = None,
+    **product_fields
+):
+    """
+    Async variant of generate_embedding for use inside the event loop.
+    
+    Args:
+        use_case: Use case for embedding
+        image_url: Image URL for visual embedding
+        store_id: Store identifier
+        **product_fields: Product attributes accepted by build_embedding_text
+        
+    Returns:
+        Dict containing text_embedding, image_embedding, and combined_embedding
+    """
+    try:
+        embedding_text = build_embedding_text(**product_fields)
+        
+        text_embedding = await _get_text_embedding_async(embedding_text, get_embedding_model(use_case), use_case)
+        
+        # OpenCLIP is CPU-bound; keep it off the event loop
         image_embedding = None
         if image_url:
-            try:
-                image_embedding = generate_image_embedding(image_url)
-                logger.info(f"Generated image embedding for {image_url}")
-            except Exception as e:
-                logger.warning(f"Failed to generate image embedding for {image_url}: {e}")
-        
-        # Generate combined embedding
-        combined_embedding = None
-        if text_embedding and image_embedding:
-            try:
-                combined_embedding = combine_embeddings(
-                    text_embedding, 
-                    image_embedding, 
-                    category=category, 
-                    store_id=store_id
-                )
-                logger.info("Generated combined text+image embedding")
-            except Exception as e:
-                logger.warning(f"Failed to generate combined embedding: {e}")
-                combined_embedding = text_embedding  # Fallback to text only
-        
-        return {
-            "text_embedding": text_embedding,
-            "image_embedding": image_embedding,
-            "combined_embedding": combined_embedding or text_embedding
-        }
+            image_embedding = await asyncio.to_thread(_generate_optional_image_embedding, image_url)
+        
+        return _assemble_embeddings(
+            text_embedding,
+            image_embedding,
+            category=product_fields.get("category"),
+            store_id=store_id
+        )
         
     except Exception as e:
         logger.error(f"Error generating embeddings: {e}")
@@ -606,6 +834,93 @@ def generate_batch_embeddings(texts: List[str], model: str = None) -> List[List[
         logger.info("Falling back to individual embedding generation")
         return [generate_embedding_cached(text, model) for text in texts]
 
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
+async def request_embeddings_async(texts: List[str], model: str) -> List[List[float]]:
+    """
+    Eén embeddings request voor een batch teksten, binnen de semaphore van de loop.
+    
+    Retried with the same backoff as generate_text_embedding_async (the client
+    itself runs with max_retries=0), so a transient 429/5xx doesn't fan out
+    into one request per text.
+    """
+    async with get_embedding_semaphore():
+        response = await get_async_openai_client().embeddings.create(
+            model=model,
+            input=texts
+        )
+    return [data.embedding for data in response.data]
+
+async def generate_batch_embeddings_async(texts: List[str], model: str = None) -> List[List[float]]:
+    """
+    Genereer embeddings voor meerdere teksten in batch via de AsyncOpenAI client.
+    
+    Args:
+        texts: Lijst van teksten om te embedden
+        model: OpenAI model naam (optioneel)
+    
+    Returns:
+        Lijst van embedding vectors
+    """
+    if not model:
+        model = get_embedding_model("product")
+    
+    if not texts:
+        return []
+    
+    try:
+        embeddings = await request_embeddings_async(texts, model)
+        logger.info(f"Generated {len(embeddings)} embeddings in batch with model {model}")
+        return embeddings
+        
+    except Exception as e:
+        logger.error(f"Error generating batch embeddings after retries: {e}")
+        # Fallback naar individuele embeddings, gelijktijdig binnen de semaphore
+        logger.info("Falling back to individual embedding generation")
+        return list(await asyncio.gather(*(generate_text_embedding_async(text, model) for text in texts)))
+
+PRODUCT_EMBEDDING_BATCH_SIZE = 100  # ~1k tokens per product tekst, ruim onder de request limiet
+
+async def generate_product_embeddings_batch_async(
+    embedding_texts: List[str],
+    image_urls: List[Optional[str]],
+    store_id: str = None
+) -> List[Dict[str, Optional[List[float]]]]:
+    """
+    Batch variant of generate_embedding_async for import runs.
+    
+    Text embeddings come from the Redis product cache where possible (retried
+    syncs re-embed nothing that was embedded before); the misses are requested
+    PRODUCT_EMBEDDING_BATCH_SIZE at a time and written back to the cache.
+    Image embeddings (if any) are generated off the event loop.
+    
+    Args:
+        embedding_texts: Texts from build_embedding_text
+        image_urls: Image URL per text (None to skip the image embedding)
+        store_id: Store identifier
+        
+    Returns:
+        One dict per text containing text_embedding, image_embedding, and combined_embedding
+    """
+    model = get_embedding_model("product")
+    results = []
+    for start in range(0, len(embedding_texts), PRODUCT_EMBEDDING_BATCH_SIZE):
+        batch_texts = embedding_texts[start:start + PRODUCT_EMBEDDING_BATCH_SIZE]
+        text_embeddings = get_cached_product_embeddings(batch_texts, model)
+        misses = [i for i, embedding in enumerate(text_embeddings) if embedding is None]
+        if misses:
+            miss_texts = [batch_texts[i] for i in misses]
+            generated = await generate_batch_embeddings_async(miss_texts, model)
+            store_product_embeddings(miss_texts, model, generated)
+            for i, embedding in zip(misses, generated):
+                text_embeddings[i] = embedding
+        logger.info(f"Product embedding batch: {len(batch_texts) - len(misses)} cached, {len(misses)} generated")
+        for text_embedding, image_url in zip(text_embeddings, image_urls[start:start + PRODUCT_EMBEDDING_BATCH_SIZE]):
+            image_embedding = None
+            if image_url:
+                image_embedding = await asyncio.to_thread(_generate_optional_image_embedding, image_url)
+            results.append(_assemble_embeddings(text_embedding, image_embedding, store_id=store_id))
+    return results
+
 def generate_batch_image_embeddings(image_urls: List[str], batch_size: int = None) -> List[List[float]]:
     """
     Genereer image embeddings voor meerdere afbeeldingen in batch.
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+One-off schema migrations for Findly AI Search.
+
+create_all only creates missing tables, so changes to existing tables
+(new columns, backfills, index swaps, dropped columns) live here instead of
+in the per-boot startup path in main.py. Each migration runs once per
+database and is recorded in schema_migrations.
+
+Run after deploying a new version:
+    python -m ai_shopify_search.core.migrations
+"""
+
+import logging
+from typing import Callable, List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+def _benchmark_history_day_epoch(conn: Connection) -> None:
+    """Add and backfill benchmark_history.day_epoch and replace the interim history indexes."""
+    columns = {column["name"] for column in inspect(conn).get_columns("benchmark_history")}
+    if "day_epoch" not in columns:
+        conn.execute(text("ALTER TABLE benchmark_history ADD COLUMN day_epoch INTEGER"))
+
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("""
+            UPDATE benchmark_history SET day_epoch = timestamp::date - DATE '1970-01-01'
+            WHERE day_epoch IS NULL
+        """))
+    else:
+        conn.execute(text("""
+            UPDATE benchmark_history SET day_epoch = CAST(julianday(DATE(timestamp)) - 2440587.5 AS INTEGER)
+            WHERE day_epoch IS NULL AND timestamp IS NOT NULL
+        """))
+
+    # Both are prefixes of ix_benchmark_history_report (see BenchmarkHistoryModel)
+    conn.execute(text("DROP INDEX IF EXISTS ix_benchmark_history_store_timestamp"))
+    conn.execute(text("DROP INDEX IF EXISTS ix_benchmark_history_store_day"))
+    conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_benchmark_history_report
+        ON benchmark_history (store_id, day_epoch, score, response_time, price_coherence)
+    """))
+
+def _products_drop_jsonb_embeddings(conn: Connection) -> None:
+    """Drop the JSONB embedding copies; combined_embedding_vector is the single source."""
+    if conn.dialect.name != "postgresql":
+        return
+    columns = {column["name"] for column in inspect(conn).get_columns("products")}
+    if "combined_embedding" in columns:
+        # Backfill the vector column first for rows that only have the JSONB copy
+        conn.execute(text("""
+            UPDATE products
+            SET combined_embedding_vector = combined_embedding::text::vector
+            WHERE combined_embedding_vector IS NULL
+              AND jsonb_typeof(combined_embedding) = 'array'
+              AND jsonb_array_length(combined_embedding) = 1536
+        """))
+        conn.execute(text("ALTER TABLE products DROP COLUMN combined_embedding"))
+    if "embedding" in columns:
+        conn.execute(text("ALTER TABLE products DROP COLUMN embedding"))
+
+def _products_tags_text_array(conn: Connection) -> None:
+    """Convert products.tags from JSONB to text[] and index it with GIN."""
+    if conn.dialect.name != "postgresql":
+        return
+    tags_type = conn.execute(text("""
+        SELECT data_type FROM information_schema.columns
+        WHERE table_name = 'products' AND column_name = 'tags'
+    """)).scalar()
+    if tags_type == "jsonb":
+        # USING cannot take a subquery, hence the column swap
+        conn.execute(text("ALTER TABLE products ADD COLUMN tags_array text[]"))
+        conn.execute(text("""
+            UPDATE products SET tags_array = ARRAY(SELECT jsonb_array_elements_text(tags))
+            WHERE jsonb_typeof(tags) = 'array'
+        """))
+        conn.execute(text("ALTER TABLE products DROP COLUMN tags"))
+        conn.execute(text("ALTER TABLE products RENAME COLUMN tags_array TO tags"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_products_tags_gin ON products USING gin (tags)"))
+
+def _products_embedding_fingerprint(conn: Connection) -> None:
+    """Add products.embedding_fingerprint (unchanged products skip re-embedding on import)."""
+    columns = {column["name"] for column in inspect(conn).get_columns("products")}
+    if "embedding_fingerprint" not in columns:
+        conn.execute(text("ALTER TABLE products ADD COLUMN embedding_fingerprint VARCHAR(32)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_products_embedding_fingerprint ON products (embedding_fingerprint)"))
+
+def _products_status_enum(conn: Connection) -> None:
+    """Convert products.status from VARCHAR to product_status_enum and add the status indexes."""
+    if conn.dialect.name != "postgresql":
+        return
+    conn.execute(text("""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'product_status_enum') THEN
+                CREATE TYPE product_status_enum AS ENUM ('active', 'draft', 'archived');
+            END IF;
+        END
+        $$
+    """))
+    status_type = conn.execute(text("""
+        SELECT data_type FROM information_schema.columns
+        WHERE table_name = 'products' AND column_name = 'status'
+    """)).scalar()
+    if status_type == "character varying":
+        conn.execute(text("""
+            ALTER TABLE products ALTER COLUMN status TYPE product_status_enum
+            USING lower(status)::product_status_enum
+        """))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_products_active ON products (id) WHERE status = 'active'"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_search_analytics_search_type ON search_analytics (search_type)"))
+
+# Applied in order; names are recorded in schema_migrations and must never change
+MIGRATIONS: List[Tuple[str, Callable[[Connection], None]]] = [
+    ("benchmark_history_day_epoch", _benchmark_history_day_epoch),
+    ("products_drop_jsonb_embeddings", _products_drop_jsonb_embeddings),
+    ("products_tags_text_array", _products_tags_text_array),
+    ("products_embedding_fingerprint", _products_embedding_fingerprint),
+    ("products_status_enum", _products_status_enum),
+]
+
+def run_migrations(engine: Engine) -> List[str]:
+    """
+    Apply pending migrations, each in its own transaction.
+
+    Args:
+        engine: Engine of the database to migrate (tables must already exist)
+
+    Returns:
+        Names of the migrations applied by this call
+    """
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                name VARCHAR(128) PRIMARY KEY,
+                applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        applied = set(conn.execute(text("SELECT name FROM schema_migrations")).scalars())
+
+    newly_applied = []
+    for name, migrate in MIGRATIONS:
+        if name in applied:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(text("INSERT INTO schema_migrations (name) VALUES (:name)"), {"name": name})
+        logger.info("Applied migration %s", name)
+        newly_applied.append(name)
+    return newly_applied
+
+if __name__ == "__main__":
+    from ai_shopify_search.core.database import engine
+    from ai_shopify_search.core.models import Base
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    # Fresh databases get the current schema from the models; migrations then only upgrade older ones
+    Base.metadata.create_all(bind=engine)
+    applied = run_migrations(engine)
+    logger.info("%d migration(s) applied", len(applied))
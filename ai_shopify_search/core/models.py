@@ -13,8 +13,11 @@ Contains SQLAlchemy models for:
 - Search Clicks
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, JSON, ForeignKey, func
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, JSON, ForeignKey, Index, Enum, func, text
 from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.schema import PrimaryKeyConstraint
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.dialects import postgresql
 from datetime import datetime
 import json
@@ -22,6 +25,69 @@ import json
 
 Base = declarative_base()
 
+class JSONEncodedList(TypeDecorator):
+    """
+    Store a Python list as JSON text.
+    
+    Used on SQLite, which has no JSONB; values are marshalled once at
+    bind/result time instead of in model constructors.
+    """
+    impl = Text
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        return json.dumps(value) if value is not None else None
+    
+    def process_result_value(self, value, dialect):
+        return json.loads(value) if value else None
+
+# JSONB on PostgreSQL, JSON-encoded text on SQLite (tests)
+ArrayType = postgresql.JSONB().with_variant(JSONEncodedList(), "sqlite")
+
+# Flat list of strings: native text[] on PostgreSQL (GIN-indexable for @> / &&), JSON text on SQLite
+TagsType = postgresql.ARRAY(Text).with_variant(JSONEncodedList(), "sqlite")
+
+# Shopify's fixed product status vocabulary: native ENUM on PostgreSQL, short VARCHAR on SQLite
+ProductStatus = Enum("active", "draft", "archived", name="product_status_enum")
+
+# search_type is an open vocabulary (ai, ai_search, fuzzy_fallback, feedback, ...),
+# so it stays a bounded VARCHAR with an index instead of an ENUM
+SearchTypeString = String(32)
+
+# pgvector column for AI search (optional dependency)
+try:
+    from pgvector.sqlalchemy import Vector
+    VectorType = Vector(1536).with_variant(JSONEncodedList(), "sqlite")
+except ImportError:
+    VectorType = ArrayType
+
+@compiles(PrimaryKeyConstraint, "postgresql")
+def _compile_partitioned_primary_key(constraint, compiler, **kw):
+    """
+    Append the partition key to the primary key of partitioned tables.
+    
+    PostgreSQL requires it in every unique constraint; the ORM keeps ``id``
+    as its identity so SQLite can still autoincrement.
+    """
+    partition_key = constraint.table.info.get("partition_key")
+    if partition_key is None or partition_key in constraint.columns.keys():
+        return compiler.visit_primary_key_constraint(constraint, **kw)
+    columns = [column.name for column in constraint.columns] + [partition_key]
+    return "PRIMARY KEY (%s)" % ", ".join(compiler.preparer.quote(name) for name in columns)
+
+def partitioned_by_month(tablename, *indexes):
+    """
+    Table args for an append-only log partitioned by ``timestamp`` (monthly ranges, PostgreSQL only).
+    
+    Adds a BRIN index on ``timestamp``: rows arrive in time order, so it is a
+    fraction of the size of a BTREE and prunes time-range scans just as well.
+    """
+    return (
+        Index(f"brin_{tablename}_timestamp", "timestamp", postgresql_using="brin").ddl_if(dialect="postgresql"),
+        *indexes,
+        {"postgresql_partition_by": "RANGE (timestamp)", "info": {"partition_key": "timestamp"}},
+    )
+
 # Base class for store-specific models (separate from main models)
 StoreBase = declarative_base()
 
@@ -100,9 +166,18 @@ class Product(Base):
     Used in the main database to track products across all stores.
     """
     __tablename__ = "products"
+    __table_args__ = (
+        # Price range + in-stock is the dominant filter on active products
+        Index("ix_products_stock_price", "stock_status", "price", postgresql_where=text("status = 'active'")),
+        Index("ix_products_tags_gin", "tags", postgresql_using="gin").ddl_if(dialect="postgresql"),
+        # Covers store_id lookups on its own, so store_id carries no single-column index
+        Index("ix_products_store_status", "store_id", "status"),
+        # Dashboards count and page active products through this partial index
+        Index("ix_products_active", "id", postgresql_where=text("status = 'active'")),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    store_id = Column(String, ForeignKey("store_registry.store_id"), nullable=False, index=True)  # Store identifier
+    store_id = Column(String, ForeignKey("store_registry.store_id"), nullable=False)  # Store identifier
     shopify_id = Column(String, nullable=False, index=True)  # Shopify product ID
     title = Column(String, nullable=False)  # Product title for search and display
     description = Column(Text, nullable=True)  # Product description
@@ -114,15 +189,14 @@ class Product(Base):
     stock_status = Column(String, nullable=True)  # in_stock, out_of_stock, etc.
     sku = Column(String, nullable=True)  # Stock keeping unit
     barcode = Column(String, nullable=True)  # Product barcode
-    status = Column(String, nullable=True)  # active, draft, archived
-    tags = Column(postgresql.JSONB)  # Product tags for filtering and search context
+    status = Column(ProductStatus, nullable=True)
+    tags = Column(TagsType)  # Product tags for filtering and search context
     price = Column(Float)  # Product price for filtering and display
     image_url = Column(String, nullable=True)  # Product image URL
-    embedding = Column(postgresql.JSONB)  # AI embedding for semantic search
-    image_embedding = Column(postgresql.JSONB)  # Image embedding for visual search
-    text_embedding = Column(postgresql.JSONB)  # Text-only embedding
-    combined_embedding = Column(postgresql.JSONB)  # Combined text + image embedding
-    combined_embedding_vector = Column(postgresql.VECTOR(1536))  # Combined embedding as vector for AI search
+    image_embedding = Column(ArrayType)  # Image embedding for visual search
+    text_embedding = Column(ArrayType)  # Text-only embedding
+    combined_embedding_vector = Column(VectorType)  # Combined text + image embedding as vector for AI search
+    embedding_fingerprint = Column(String(32), nullable=True, index=True)  # Hash of embedding inputs; unchanged products skip re-embedding
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
@@ -133,6 +207,10 @@ class StoreProduct(StoreBase):
     Used in individual store databases for search operations.
     """
     __tablename__ = "products"
+    __table_args__ = (
+        Index("ix_products_stock_price", "stock_status", "price", postgresql_where=text("status = 'active'")),
+        Index("ix_products_tags_gin", "tags", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     shopify_id = Column(String, nullable=False, index=True)  # Shopify product ID
@@ -146,25 +224,27 @@ class StoreProduct(StoreBase):
     stock_status = Column(String, nullable=True)  # in_stock, out_of_stock, etc.
     sku = Column(String, nullable=True)  # Stock keeping unit
     barcode = Column(String, nullable=True)  # Product barcode
-    status = Column(String, nullable=True)  # active, draft, archived
-    tags = Column(postgresql.JSONB)  # Product tags for filtering and search context
+    status = Column(ProductStatus, nullable=True)
+    tags = Column(TagsType)  # Product tags for filtering and search context
     price = Column(Float)  # Product price for filtering and display
     image_url = Column(String, nullable=True)  # Product image URL
-    embedding = Column(postgresql.JSONB)  # AI embedding for semantic search
-    image_embedding = Column(postgresql.JSONB)  # Image embedding for visual search
-    text_embedding = Column(postgresql.JSONB)  # Text-only embedding
-    combined_embedding = Column(postgresql.JSONB)  # Combined text + image embedding
-    combined_embedding_vector = Column(postgresql.VECTOR(1536))  # Combined embedding as vector for AI search
+    image_embedding = Column(ArrayType)  # Image embedding for visual search
+    text_embedding = Column(ArrayType)  # Text-only embedding
+    combined_embedding_vector = Column(VectorType)  # Combined text + image embedding as vector for AI search
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
 class SearchAnalytics(Base):
     """Search analytics model."""
     __tablename__ = "search_analytics"
+    __table_args__ = partitioned_by_month(
+        "search_analytics",
+        Index("ix_search_analytics_query_timestamp", "query", "timestamp"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     query = Column(String, nullable=False)
-    search_type = Column(String, default="ai")
+    search_type = Column(SearchTypeString, default="ai", index=True)
     filters = Column(JSON)
     result_count = Column(Integer)
     page = Column(Integer, default=1)
@@ -173,7 +253,7 @@ class SearchAnalytics(Base):
     cache_hit = Column(Boolean, default=False)
     user_agent = Column(String)
     ip_address = Column(String)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, nullable=False, default=datetime.utcnow)
 
 class QuerySuggestion(Base):
     """Query suggestion model."""
@@ -211,15 +291,20 @@ class SearchCorrection(Base):
 class SearchClick(Base):
     """Search click tracking model."""
     __tablename__ = "search_clicks"
+    __table_args__ = partitioned_by_month("search_clicks")
     
     id = Column(Integer, primary_key=True, index=True)
-    search_analytics_id = Column(Integer, ForeignKey("search_analytics.id"))
+    # No FK constraint: search_analytics is partitioned, so id alone is not unique there
+    search_analytics_id = Column(Integer, index=True)
     product_id = Column(Integer, ForeignKey("products.id"))
     position = Column(Integer)
     click_time_ms = Column(Float)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, nullable=False, default=datetime.utcnow)
     
-    search_analytics = relationship("SearchAnalytics")
+    search_analytics = relationship(
+        "SearchAnalytics",
+        primaryjoin="foreign(SearchClick.search_analytics_id) == SearchAnalytics.id",
+    )
     product = relationship("Product")
 
 class FacetUsage(Base):
@@ -242,7 +327,7 @@ class SearchPerformance(Base):
     response_time_ms = Column(Float)
     result_count = Column(Integer)
     cache_hit = Column(Boolean, default=False)
-    search_type = Column(String, default="ai")
+    search_type = Column(SearchTypeString, default="ai", index=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
 
@@ -299,6 +384,12 @@ class IntentMatrixModel(Base):
 
 class BenchmarkHistoryModel(Base):
     __tablename__ = "benchmark_history"
+    __table_args__ = partitioned_by_month(
+        "benchmark_history",
+        Index("ix_benchmark_history_query_timestamp", "query", "timestamp"),
+        # Covers get_benchmark_history (per-store daily aggregates) without touching the wide rows
+        Index("ix_benchmark_history_report", "store_id", "day_epoch", "score", "response_time", "price_coherence"),
+    )
     id = Column(Integer, primary_key=True)
     store_id = Column(String, index=True)
     query = Column(String)
@@ -315,5 +406,6 @@ class BenchmarkHistoryModel(Base):
     diversity_score = Column(Float)
     category_coverage = Column(Float)
     conversion_potential = Column(Float)
-    timestamp = Column(DateTime)
+    timestamp = Column(DateTime, nullable=False, default=datetime.utcnow)
+    day_epoch = Column(Integer)  # Calendar day of timestamp as days since 1970-01-01 (history is grouped per day)
     last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
@@ -6,11 +6,16 @@ This module automatically applies fallback filters when search results are poor.
 It analyzes search performance and dynamically adjusts filters to improve results.
 """
 
+import itertools
+import math
 import logging
-from typing import Dict, List, Any, Optional, Tuple
-from dataclasses import dataclass
-import statistics
+import re
+from typing import Dict, List, Any, Optional, Tuple, Callable, Iterator
+from collections import ChainMap
+from dataclasses import dataclass, field
+from functools import lru_cache
 import json
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +46,12 @@ RESULT_COUNT_THRESHOLDS = {
     "HIGH": 15
 }
 
+# Shared stand-in for a missing query_analysis["detected_intents"] (never mutated)
+_NO_INTENTS = frozenset()
+
+# Price filter: below this many results (and without precomputed columns) a plain loop is faster
+PRICE_FILTER_VECTORIZE_MIN = 64
+
 # Category coverage thresholds
 CATEGORY_COVERAGE_THRESHOLDS = {
     "LOW": 0.3,
@@ -48,6 +59,23 @@ CATEGORY_COVERAGE_THRESHOLDS = {
     "HIGH": 0.7
 }
 
+# Tag classification patterns (case-insensitive, one C-level scan per tag)
+CATEGORY_TAG_PATTERN = re.compile(r"schoenen|jas|shirt|broek|jurk", re.IGNORECASE)
+BRAND_TAG_PATTERN = re.compile(r"urbanwear|fashionista|stylehub", re.IGNORECASE)
+COLOR_TAG_PATTERN = re.compile(r"zwart|rood|blauw|wit|groen", re.IGNORECASE)
+
+# Query intent keywords, matched as one alternation (first hit short-circuits)
+PRICE_INTENT_PATTERN = re.compile(r"euro|€|prijs|price|onder|boven|tussen|max|min", re.IGNORECASE)
+CATEGORY_INTENT_PATTERN = re.compile(r"categorie|category|type|soort|kleding|elektronica", re.IGNORECASE)
+QUERY_INTENT_CACHE_SIZE = 4096
+
+# Tag classes for _classify_tag (tags recur across queries, so the class is cached per tag)
+TAG_CLASS_CATEGORY = 0
+TAG_CLASS_BRAND = 1
+TAG_CLASS_COLOR = 2
+TAG_CLASS_OTHER = 3
+TAG_CLASS_CACHE_SIZE = 16384
+
 # Error Messages
 ERROR_ADAPTIVE_FILTERS = "Error getting adaptive filters: {error}"
 ERROR_NO_STRATEGIES = "No adaptive filters needed"
@@ -57,7 +85,99 @@ LOG_CONTEXT_QUERY = "query"
 LOG_CONTEXT_STRATEGY = "strategy"
 LOG_CONTEXT_IMPROVEMENT_SCORE = "improvement_score"
 
-@dataclass
+def _mean(values: List[float]) -> float:
+    """Plain float mean (fsum keeps statistics.mean's rounding without its rational accumulator)."""
+    return math.fsum(values) / len(values) if values else 0.0
+
+def _reduce_scores_prices(scores: np.ndarray, prices: np.ndarray) -> Tuple[float, float, float]:
+    """Mean score, mean of the first five prices and price spread (0 where undefined)."""
+    avg_score = scores.mean() if scores.size else 0.0
+    avg_price_top5 = prices[:5].mean() if prices.size else 0.0
+    price_range = prices.max() - prices.min() if prices.size > 1 else 0.0
+    return avg_score, avg_price_top5, price_range
+
+@lru_cache(maxsize=QUERY_INTENT_CACHE_SIZE)
+def _query_intent_flags(query: str) -> Tuple[bool, bool]:
+    """(has_price_intent, has_category_intent) for a query; cached since search traffic repeats queries."""
+    return (
+        PRICE_INTENT_PATTERN.search(query) is not None,
+        CATEGORY_INTENT_PATTERN.search(query) is not None
+    )
+
+# Metrics compared by the improvement score, in kernel column order
+IMPROVEMENT_METRICS = ("avg_score", "result_count", "diversity_score")
+
+def _improvement_scores(original: np.ndarray, improved: np.ndarray) -> np.ndarray:
+    """Per row: mean of max(0, relative gain) over the metrics whose original value is > 0."""
+    valid = original > 0
+    safe_base = np.where(valid, original, 1.0)
+    gains = np.where(valid, np.maximum(0.0, (improved - original) / safe_base), 0.0)
+    counts = valid.sum(axis=1)
+    return np.divide(gains.sum(axis=1), counts, out=np.zeros(len(counts)), where=counts > 0)
+
+@lru_cache(maxsize=TAG_CLASS_CACHE_SIZE)
+def _classify_tag(tag: str) -> int:
+    """Category, brand, color or other (first matching pattern wins)."""
+    if CATEGORY_TAG_PATTERN.search(tag):
+        return TAG_CLASS_CATEGORY
+    if BRAND_TAG_PATTERN.search(tag):
+        return TAG_CLASS_BRAND
+    if COLOR_TAG_PATTERN.search(tag):
+        return TAG_CLASS_COLOR
+    return TAG_CLASS_OTHER
+
+def _match_condition_table(metric_vector: np.ndarray, mins: np.ndarray, maxs: np.ndarray) -> np.ndarray:
+    """Per strategy row: True when every metric lies within [min, max] (NaN metrics never fail)."""
+    # Broadcast the metric vector against all rows; NaN compares False, so it is never a violation
+    return ~((metric_vector < mins) | (metric_vector > maxs)).any(axis=1)
+
+def _is_number(value: Any) -> bool:
+    """True for int/float/bool and NumPy scalars (values that can live in a float64 table)."""
+    return isinstance(value, (int, float, np.number))
+
+def compile_trigger_conditions(conditions: Dict[str, Any]) -> Callable[[Dict[str, Any]], bool]:
+    """
+    Compile trigger conditions into a predicate over a metrics dict.
+    
+    Range conditions ({"min": .., "max": ..}) become (key, lo, hi) bounds and anything
+    else an exact-match check; metrics missing from the dict don't constrain the result.
+    
+    Args:
+        conditions: Strategy trigger conditions
+        
+    Returns:
+        Function returning True when the metrics satisfy all conditions
+    """
+    range_checks = []
+    exact_checks = []
+    
+    for condition_key, condition_value in conditions.items():
+        if isinstance(condition_value, dict):
+            range_checks.append((
+                condition_key,
+                condition_value.get("min", float('-inf')),
+                condition_value.get("max", float('inf'))
+            ))
+        else:
+            exact_checks.append((condition_key, condition_value))
+    
+    range_checks = tuple(range_checks)
+    exact_checks = tuple(exact_checks)
+    
+    def predicate(metrics: Dict[str, Any]) -> bool:
+        for condition_key, min_value, max_value in range_checks:
+            if condition_key in metrics:
+                metric_value = metrics[condition_key]
+                if metric_value < min_value or metric_value > max_value:
+                    return False
+        for condition_key, expected in exact_checks:
+            if condition_key in metrics and metrics[condition_key] != expected:
+                return False
+        return True
+    
+    return predicate
+
+@dataclass(slots=True)
 class FilterStrategy:
     """Represents a filter strategy with conditions and actions."""
     name: str
@@ -66,16 +186,50 @@ class FilterStrategy:
     priority: int                       # Higher priority = applied first
     success_rate: float                 # Historical success rate
     usage_count: int                    # How often used
+    # trigger_conditions compiled once (see compile_trigger_conditions)
+    compiled_predicate: Optional[Callable[[Dict[str, Any]], bool]] = field(default=None, repr=False, compare=False)
+    
+    def __post_init__(self):
+        if self.compiled_predicate is None:
+            self.compiled_predicate = compile_trigger_conditions(self.trigger_conditions)
 
-@dataclass
+@dataclass(slots=True)
 class AdaptiveFilterResult:
     """Result of adaptive filtering."""
     original_results: List[Dict[str, Any]]
-    improved_results: List[Dict[str, Any]]
+    improved_results: Optional[List[Dict[str, Any]]]  # None = unchanged, use original_results
     applied_strategies: List[str]
     improvement_score: float
     filters_applied: Dict[str, Any]
     reasoning: str
+    
+    @property
+    def final_results(self) -> List[Dict[str, Any]]:
+        """Results to serve: the improved list, or the original one when nothing changed."""
+        return self.original_results if self.improved_results is None else self.improved_results
+
+@dataclass(slots=True)
+class _ResultVectors:
+    """Per-result columns (scores, prices, tags) read once from the result dicts."""
+    scores: np.ndarray
+    prices: np.ndarray          # 0 where a result has no price
+    tags: List[List[str]]
+    
+    @classmethod
+    def from_results(cls, results: List[Dict[str, Any]]) -> "_ResultVectors":
+        """Build the columns in one pass over the result dicts."""
+        scores = []
+        prices = []
+        tags = []
+        for result in results:
+            scores.append(result.get("similarity", 0))
+            prices.append(result.get("price") or 0)
+            tags.append(result.get("tags", []))
+        return cls(np.asarray(scores, dtype=np.float64), np.asarray(prices, dtype=np.float64), tags)
+
+def _strategy_sort_key(strategy: FilterStrategy) -> Tuple[int, float]:
+    """Sort key for strategy selection: priority first, then highest success rate."""
+    return strategy.priority, -strategy.success_rate
 
 class AdaptiveFilterEngine:
     """Engine for automatically applying adaptive filters to improve search results."""
@@ -87,6 +241,7 @@ class AdaptiveFilterEngine:
         Sets up filter strategies and configuration parameters.
         """
         self.filter_strategies = self._initialize_strategies()
+        self._build_condition_table()
         self.min_improvement_threshold = DEFAULT_MIN_IMPROVEMENT_THRESHOLD
         self.max_strategies_per_query = DEFAULT_MAX_STRATEGIES_PER_QUERY
     
@@ -199,16 +354,84 @@ class AdaptiveFilterEngine:
         # Add diversity-based strategies
         strategies.extend(self._create_diversity_strategies())
         
+        # Selection order (lower number = higher priority, then success rate), sorted once here
+        strategies.sort(key=_strategy_sort_key)
+        
         return strategies
     
+    def _resort_strategies(self):
+        """Restore selection order after priority or success_rate changes at runtime."""
+        self.filter_strategies.sort(key=_strategy_sort_key)
+        self._build_condition_table()
+    
+    def _build_condition_table(self):
+        """
+        Compile all trigger conditions into a (strategies x metrics) bounds table.
+        
+        Range conditions fill [min, max], numeric exact matches become min == max and
+        unconstrained cells stay at [-inf, inf]. Strategies with non-numeric conditions
+        are marked so they are checked with their compiled predicate instead.
+        """
+        self._condition_keys = sorted({
+            key for strategy in self.filter_strategies for key in strategy.trigger_conditions
+        })
+        key_index = {key: col for col, key in enumerate(self._condition_keys)}
+        shape = (len(self.filter_strategies), len(self._condition_keys))
+        self._condition_mins = np.full(shape, -np.inf)
+        self._condition_maxs = np.full(shape, np.inf)
+        self._condition_table_rows = []
+        
+        for row, strategy in enumerate(self.filter_strategies):
+            in_table = True
+            for condition_key, condition_value in strategy.trigger_conditions.items():
+                if isinstance(condition_value, dict):
+                    min_value = condition_value.get("min", float('-inf'))
+                    max_value = condition_value.get("max", float('inf'))
+                else:
+                    min_value = max_value = condition_value
+                if not (_is_number(min_value) and _is_number(max_value)):
+                    in_table = False
+                    break
+                self._condition_mins[row, key_index[condition_key]] = min_value
+                self._condition_maxs[row, key_index[condition_key]] = max_value
+            self._condition_table_rows.append(in_table)
+    
+    def _matching_strategies(self, metrics: Dict[str, Any]) -> Optional[Iterator[FilterStrategy]]:
+        """
+        Evaluate all strategies against the bounds table in one compiled call.
+        
+        Returns:
+            Lazy iterator over matching strategies in selection order, or None if the
+            metrics can't be encoded as a float vector (callers then fall back to
+            per-strategy predicates)
+        """
+        metric_values = []
+        for key in self._condition_keys:
+            value = metrics.get(key, np.nan)
+            if not _is_number(value):
+                return None
+            metric_values.append(value)
+        
+        matches = _match_condition_table(
+            np.asarray(metric_values, dtype=np.float64), self._condition_mins, self._condition_maxs
+        )
+        
+        return (
+            strategy
+            for strategy, matched, in_table in zip(self.filter_strategies, matches, self._condition_table_rows)
+            if (matched if in_table else strategy.compiled_predicate(metrics))
+        )
+    
     def analyze_search_performance(self, results: List[Dict[str, Any]], 
-                                 query_analysis: Dict[str, Any]) -> Dict[str, Any]:
+                                 query_analysis: Dict[str, Any],
+                                 vectors: Optional[_ResultVectors] = None) -> Dict[str, Any]:
         """
         Analyze search performance to determine if adaptive filtering is needed.
         
         Args:
             results: Search results
             query_analysis: Query analysis data
+            vectors: Precomputed columns for results
             
         Returns:
             Dictionary with performance analysis
@@ -220,8 +443,28 @@ class AdaptiveFilterEngine:
                 "metrics": {}
             }
         
+        if vectors is None:
+            vectors = _ResultVectors.from_results(results)
+        
+        # Healthy result sets (relevant and plentiful) skip the tag scans for coverage/diversity
+        result_count = len(results)
+        if result_count >= RESULT_COUNT_THRESHOLDS["HIGH"]:
+            avg_score = float(vectors.scores.mean())
+            if avg_score >= SCORE_THRESHOLDS["GOOD"]:
+                detected_intents = query_analysis.get("detected_intents") or _NO_INTENTS
+                return {
+                    "needs_improvement": False,
+                    "issues": [],
+                    "metrics": {
+                        "avg_score": avg_score,
+                        "result_count": result_count,
+                        "material_intent_detected": "material_intent" in detected_intents,
+                        "color_intent_detected": "color_intent" in detected_intents
+                    }
+                }
+        
         # Calculate performance metrics using helper
-        metrics = self._calculate_performance_metrics(results, query_analysis)
+        metrics = self._calculate_performance_metrics(results, query_analysis, vectors)
         
         # Identify issues using helper
         issues = self._identify_performance_issues(metrics)
@@ -239,57 +482,49 @@ class AdaptiveFilterEngine:
         if not performance_analysis["needs_improvement"]:
             return []
         
-        applicable_strategies = []
         metrics = performance_analysis["metrics"]
         issues = performance_analysis["issues"]
         
-        for strategy in self.filter_strategies:
-            if self._strategy_applies(strategy, metrics, issues):
-                applicable_strategies.append(strategy)
+        # filter_strategies is kept in selection order, so the applicable subset is already sorted
+        applicable_strategies = self._matching_strategies(metrics)
         
-        # Sort by priority (lower number = higher priority) and success rate
-        applicable_strategies.sort(key=lambda s: (s.priority, -s.success_rate))
+        if applicable_strategies is None:
+            applicable_strategies = (
+                strategy for strategy in self.filter_strategies
+                if self._strategy_applies(strategy, metrics, issues)
+            )
         
-        # Limit to max strategies per query
-        return applicable_strategies[:self.max_strategies_per_query]
+        # Limit to max strategies per query; remaining predicates are never evaluated
+        return list(itertools.islice(applicable_strategies, self.max_strategies_per_query))
     
     def _strategy_applies(self, strategy: FilterStrategy, metrics: Dict[str, Any], 
                          issues: List[str]) -> bool:
         """Check if a strategy applies to the current situation."""
-        conditions = strategy.trigger_conditions
-        
-        for condition_key, condition_value in conditions.items():
-            if condition_key in metrics:
-                metric_value = metrics[condition_key]
-                
-                if isinstance(condition_value, dict):
-                    # Range condition
-                    if "min" in condition_value and metric_value < condition_value["min"]:
-                        return False
-                    if "max" in condition_value and metric_value > condition_value["max"]:
-                        return False
-                elif isinstance(condition_value, bool):
-                    # Boolean condition
-                    if metric_value != condition_value:
-                        return False
-                else:
-                    # Exact match condition
-                    if metric_value != condition_value:
-                        return False
-        
-        return True
+        return strategy.compiled_predicate(metrics)
     
     def apply_adaptive_filters(self, original_results: List[Dict[str, Any]], 
                              query_analysis: Dict[str, Any],
-                             search_service) -> AdaptiveFilterResult:
-        """Apply adaptive filters to improve search results."""
+                             search_service, *,
+                             performance_analysis: Optional[Dict[str, Any]] = None,
+                             strategies: Optional[List[FilterStrategy]] = None) -> AdaptiveFilterResult:
+        """
+        Apply adaptive filters to improve search results.
+        
+        Callers that already ran analyze_search_performance / select_adaptive_strategies
+        for these results can pass them in to skip the recomputation.
+        """
+        original_vectors = None
+        
         # Analyze current performance
-        performance_analysis = self.analyze_search_performance(original_results, query_analysis)
+        if performance_analysis is None:
+            # Read the result dicts once; analysis and the price filter work on these columns
+            original_vectors = _ResultVectors.from_results(original_results)
+            performance_analysis = self.analyze_search_performance(original_results, query_analysis, original_vectors)
         
         if not performance_analysis["needs_improvement"]:
             return AdaptiveFilterResult(
                 original_results=original_results,
-                improved_results=original_results,
+                improved_results=None,
                 applied_strategies=[],
                 improvement_score=0.0,
                 filters_applied={},
@@ -297,50 +532,63 @@ class AdaptiveFilterEngine:
             )
         
         # Select strategies
-        strategies = self.select_adaptive_strategies(performance_analysis)
+        if strategies is None:
+            strategies = self.select_adaptive_strategies(performance_analysis)
         
         if not strategies:
             return AdaptiveFilterResult(
                 original_results=original_results,
-                improved_results=original_results,
+                improved_results=None,
                 applied_strategies=[],
                 improvement_score=0.0,
                 filters_applied={},
                 reasoning="No applicable strategies found"
             )
         
-        # Apply strategies
-        improved_results = original_results.copy()
+        # Apply strategies (no copy: strategies return a new list when they change the results)
+        improved_results = original_results
+        improved_vectors = original_vectors
         applied_strategies = []
-        filters_applied = {}
+        applied_strategy_objs: List[FilterStrategy] = []
+        # Stays 0.0 when no strategy changed the results (nothing to compare)
+        improvement_score = 0.0
         
         for strategy in strategies:
             try:
                 # Apply the strategy
-                strategy_result = self._apply_strategy(strategy, improved_results, search_service)
-                
-                if strategy_result:
-                    improved_results = strategy_result
-                    applied_strategies.append(strategy.name)
-                    filters_applied.update(strategy.filter_actions)
-                    
-                    # Update strategy usage
-                    strategy.usage_count += 1
-                    
-                    logger.info(f"Applied adaptive filter strategy: {strategy.name}")
-                
+                strategy_result = self._apply_strategy(strategy, improved_results, search_service, improved_vectors)
             except Exception as e:
-                logger.warning(f"Failed to apply strategy {strategy.name}: {e}")
+                logger.warning("Failed to apply strategy %s: %s", strategy.name, e)
                 continue
-        
-        # Calculate improvement
-        improvement_score = self._calculate_improvement_score(original_results, improved_results)
+            
+            # Strategies that hand back the same list (placeholders, filters that keep
+            # everything) changed nothing and aren't counted as applied
+            if not strategy_result or strategy_result is improved_results:
+                continue
+            
+            improved_results = strategy_result
+            improved_vectors = None
+            applied_strategies.append(strategy.name)
+            applied_strategy_objs.append(strategy)
+            
+            # Update strategy usage
+            strategy.usage_count += 1
+            
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Applied adaptive filter strategy: %s", strategy.name)
+            
+            # Greedy: stop as soon as the results are good enough instead of applying every pick
+            improvement_score = self._calculate_improvement_score(
+                original_results, improved_results, performance_analysis["metrics"]
+            )
+            if improvement_score >= self.min_improvement_threshold:
+                break
         
         # Only return improved results if there's significant improvement
         if improvement_score < self.min_improvement_threshold:
             return AdaptiveFilterResult(
                 original_results=original_results,
-                improved_results=original_results,
+                improved_results=None,
                 applied_strategies=[],
                 improvement_score=0.0,
                 filters_applied={},
@@ -349,6 +597,9 @@ class AdaptiveFilterEngine:
         
         reasoning = f"Applied {len(applied_strategies)} strategies: {', '.join(applied_strategies)}"
         
+        # Merged only once results are kept; later strategies win on shared keys (first map in a ChainMap wins)
+        filters_applied = dict(ChainMap(*(s.filter_actions for s in reversed(applied_strategy_objs))))
+        
         return AdaptiveFilterResult(
             original_results=original_results,
             improved_results=improved_results,
@@ -359,7 +610,7 @@ class AdaptiveFilterEngine:
         )
     
     def _apply_strategy(self, strategy: FilterStrategy, current_results: List[Dict[str, Any]], 
-                       search_service) -> Optional[List[Dict[str, Any]]]:
+                       search_service, vectors: Optional[_ResultVectors] = None) -> Optional[List[Dict[str, Any]]]:
         """Apply a specific filter strategy."""
         actions = strategy.filter_actions
         
@@ -373,7 +624,7 @@ class AdaptiveFilterEngine:
         elif "price_range" in actions:
             # Apply price range filter
             price_range = actions["price_range"]
-            return self._apply_price_filter(current_results, price_range)
+            return self._apply_price_filter(current_results, price_range, vectors)
         
         elif "category_expansion" in actions and actions["category_expansion"]:
             # Expand category search
@@ -400,18 +651,28 @@ class AdaptiveFilterEngine:
         return results
     
     def _apply_price_filter(self, results: List[Dict[str, Any]], 
-                           price_range: Dict[str, float]) -> List[Dict[str, Any]]:
+                           price_range: Dict[str, float],
+                           vectors: Optional[_ResultVectors] = None) -> List[Dict[str, Any]]:
         """Apply price range filter."""
         min_price = price_range.get("min", 0)
         max_price = price_range.get("max", float('inf'))
         
-        filtered_results = []
-        for result in results:
-            price = result.get("price", 0)
-            if min_price <= price <= max_price:
-                filtered_results.append(result)
+        if vectors is None and len(results) < PRICE_FILTER_VECTORIZE_MIN:
+            # Small pages: a comprehension beats building a price array
+            filtered_results = [r for r in results if min_price <= (r.get("price") or 0) <= max_price]
+            return results if len(filtered_results) == len(results) else filtered_results
+        
+        # Vectorized range check instead of a per-result compare-and-append loop
+        if vectors is not None:
+            prices = vectors.prices
+        else:
+            prices = np.fromiter((r.get("price") or 0 for r in results), dtype=np.float64, count=len(results))
+        mask = (prices >= min_price) & (prices <= max_price)
         
-        return filtered_results
+        if mask.all():
+            return results
+        
+        return list(itertools.compress(results, mask.tolist()))
     
     def _expand_categories(self, results: List[Dict[str, Any]], search_service) -> List[Dict[str, Any]]:
         """Expand category search."""
@@ -423,15 +684,15 @@ class AdaptiveFilterEngine:
         if len(results) <= max_similar:
             return results
         
-        # Simple diversity implementation - take every nth result
-        step = len(results) // max_similar
-        diverse_results = []
+        if max_similar < 2:
+            return results[:max_similar]
         
-        for i in range(0, len(results), step):
-            if len(diverse_results) < max_similar:
-                diverse_results.append(results[i])
+        # Simple diversity implementation - max_similar evenly spaced picks across the whole list
+        # (integer linspace: no NumPy call overhead for a handful of picks, no float truncation)
+        last = len(results) - 1
+        span = max_similar - 1
         
-        return diverse_results
+        return [results[i * last // span] for i in range(max_similar)]
     
     def _apply_material_fallback(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Apply material fallback strategy."""
@@ -443,57 +704,92 @@ class AdaptiveFilterEngine:
         # This would look for similar colors or include neutral colors
         return results
     
-    def _calculate_category_coverage(self, results: List[Dict[str, Any]]) -> float:
-        """Calculate category coverage score."""
-        if not results:
-            return 0.0
+    def _compute_all_metrics(self, results: List[Dict[str, Any]],
+                             vectors: Optional[_ResultVectors] = None) -> Dict[str, Any]:
+        """
+        Compute all result-set metrics from a single read of the results.
         
-        categories = set()
-        for result in results:
-            tags = result.get("tags", [])
-            for tag in tags:
-                if any(cat in tag.lower() for cat in ["schoenen", "jas", "shirt", "broek", "jurk"]):
-                    categories.add(tag)
+        Scores, prices and tags come from the result columns (built here unless the
+        caller already has them); the coverage, diversity and score helpers all read
+        from this dict.
         
-        return len(categories) / len(results)
-    
-    def _calculate_diversity_score(self, results: List[Dict[str, Any]]) -> float:
-        """Calculate diversity score."""
-        if len(results) < 2:
-            return 0.0
+        Args:
+            results: Search results
+            vectors: Precomputed columns for results
+            
+        Returns:
+            Dictionary with avg_score, result_count, avg_price_top5, price_range,
+            category_coverage and diversity_score
+        """
+        result_count = len(results)
+        if not result_count:
+            return {
+                "avg_score": 0.0,
+                "result_count": 0,
+                "avg_price_top5": 0,
+                "price_range": 0,
+                "category_coverage": 0.0,
+                "diversity_score": 0.0
+            }
+        
+        if vectors is None:
+            vectors = _ResultVectors.from_results(results)
         
-        # Calculate diversity based on different attributes
         categories = set()
         brands = set()
         colors = set()
         
-        for result in results:
-            tags = result.get("tags", [])
+        for tags in vectors.tags:
             for tag in tags:
-                if any(cat in tag.lower() for cat in ["schoenen", "jas", "shirt", "broek", "jurk"]):
+                tag_class = _classify_tag(tag)
+                if tag_class == TAG_CLASS_CATEGORY:
                     categories.add(tag)
-                elif any(brand in tag.lower() for brand in ["urbanwear", "fashionista", "stylehub"]):
+                elif tag_class == TAG_CLASS_BRAND:
                     brands.add(tag)
-                elif any(color in tag.lower() for color in ["zwart", "rood", "blauw", "wit", "groen"]):
+                elif tag_class == TAG_CLASS_COLOR:
                     colors.add(tag)
         
-        diversity_factors = [
-            len(categories) / len(results),
-            len(brands) / len(results),
-            len(colors) / len(results)
-        ]
+        # Only priced results count towards the price metrics
+        prices = vectors.prices[vectors.prices != 0]
+        avg_score, avg_price_top5, price_range = _reduce_scores_prices(vectors.scores, prices)
         
-        return statistics.mean(diversity_factors)
+        if result_count < 2:
+            diversity_score = 0.0
+        else:
+            # Mean of the category/brand/color ratios, as one exact integer division
+            diversity_score = (len(categories) + len(brands) + len(colors)) / (3 * result_count)
+        
+        return {
+            "avg_score": float(avg_score),
+            "result_count": result_count,
+            "avg_price_top5": float(avg_price_top5) if prices.size else 0,
+            "price_range": float(price_range) if prices.size > 1 else 0,
+            "category_coverage": len(categories) / result_count,
+            "diversity_score": diversity_score
+        }
+    
+    def _calculate_category_coverage(self, results: List[Dict[str, Any]]) -> float:
+        """Calculate category coverage score."""
+        return self._compute_all_metrics(results)["category_coverage"]
+    
+    def _calculate_diversity_score(self, results: List[Dict[str, Any]]) -> float:
+        """Calculate diversity score."""
+        return self._compute_all_metrics(results)["diversity_score"]
     
     def _calculate_improvement_score(self, original_results: List[Dict[str, Any]], 
-                                   improved_results: List[Dict[str, Any]]) -> float:
+                                   improved_results: List[Dict[str, Any]],
+                                   original_metrics: Optional[Dict[str, Any]] = None) -> float:
         """Calculate improvement score between original and improved results."""
         if not original_results or not improved_results:
             return 0.0
         
-        # Calculate metrics for both result sets
-        original_metrics = self._calculate_result_metrics(original_results)
-        improved_metrics = self._calculate_result_metrics(improved_results)
+        # Calculate metrics for both result sets (the original ones usually come from analyze_search_performance)
+        if original_metrics is None:
+            original_metrics = self._compute_all_metrics(original_results)
+        if improved_results is original_results:
+            improved_metrics = original_metrics
+        else:
+            improved_metrics = self._compute_all_metrics(improved_results)
         
         # Calculate improvement for each metric
         improvements = []
@@ -510,23 +806,53 @@ class AdaptiveFilterEngine:
             diversity_improvement = (improved_metrics["diversity_score"] - original_metrics["diversity_score"]) / original_metrics["diversity_score"]
             improvements.append(max(0, diversity_improvement))
         
-        return statistics.mean(improvements) if improvements else 0.0
+        return _mean(improvements)
+    
+    def improvement_score_batch(self, result_pairs: List[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]) -> np.ndarray:
+        """
+        Improvement scores for many (original, improved) result pairs at once.
+        
+        Meant for offline replay / threshold tuning; per pair this matches
+        _calculate_improvement_score, with the arithmetic done by one vectorized
+        NumPy pass (_improvement_scores) over the (N, 3) metrics matrices.
+        
+        Args:
+            result_pairs: (original_results, improved_results) tuples
+            
+        Returns:
+            Array with one improvement score per pair
+        """
+        original = np.zeros((len(result_pairs), len(IMPROVEMENT_METRICS)))
+        improved = np.zeros_like(original)
+        
+        # Replays reuse the same result lists across many pairs; each list is scanned once.
+        # Keying on id() is safe here because result_pairs keeps every list alive for the call.
+        metric_rows: Dict[int, List[float]] = {}
+        
+        def metric_row(results: List[Dict[str, Any]]) -> List[float]:
+            row_values = metric_rows.get(id(results))
+            if row_values is None:
+                metrics = self._compute_all_metrics(results)
+                row_values = metric_rows[id(results)] = [metrics[key] for key in IMPROVEMENT_METRICS]
+            return row_values
+        
+        for row, (original_results, improved_results) in enumerate(result_pairs):
+            # Empty on either side scores 0: leave the original row at 0 so no metric counts
+            if not original_results or not improved_results:
+                continue
+            original[row] = metric_row(original_results)
+            improved[row] = metric_row(improved_results)
+        
+        return _improvement_scores(original, improved)
     
     def _calculate_result_metrics(self, results: List[Dict[str, Any]]) -> Dict[str, float]:
         """Calculate metrics for a result set."""
-        if not results:
-            return {
-                "avg_score": 0.0,
-                "result_count": 0,
-                "diversity_score": 0.0
-            }
-        
-        scores = [r.get("similarity", 0) for r in results]
+        metrics = self._compute_all_metrics(results)
         
         return {
-            "avg_score": statistics.mean(scores) if scores else 0.0,
-            "result_count": len(results),
-            "diversity_score": self._calculate_diversity_score(results)
+            "avg_score": metrics["avg_score"],
+            "result_count": metrics["result_count"],
+            "diversity_score": metrics["diversity_score"]
         }
     
     def get_strategy_statistics(self) -> Dict[str, Any]:
@@ -552,11 +878,12 @@ class AdaptiveFilterEngine:
         """Get adaptive filters for the current search context."""
         try:
             # Analyze current search performance
+            has_price_intent, has_category_intent = _query_intent_flags(query)
             query_analysis = {
                 "query": query,
                 "result_count": len(current_results),
-                "has_price_intent": self._has_price_intent(query),
-                "has_category_intent": self._has_category_intent(query)
+                "has_price_intent": has_price_intent,
+                "has_category_intent": has_category_intent
             }
             
             performance_analysis = self.analyze_search_performance(current_results, query_analysis)
@@ -566,7 +893,10 @@ class AdaptiveFilterEngine:
             
             # Apply adaptive filtering
             if strategies:
-                result = self.apply_adaptive_filters(current_results, query_analysis, search_service)
+                result = self.apply_adaptive_filters(
+                    current_results, query_analysis, search_service,
+                    performance_analysis=performance_analysis, strategies=strategies
+                )
                 return {
                     "filters_applied": result.filters_applied,
                     "improvement_score": result.improvement_score,
@@ -582,7 +912,7 @@ class AdaptiveFilterEngine:
             }
             
         except Exception as e:
-            logger.error(f"Error getting adaptive filters: {e}")
+            logger.error("Error getting adaptive filters: %s", e)
             return {
                 "filters_applied": {},
                 "improvement_score": 0.0,
@@ -592,21 +922,21 @@ class AdaptiveFilterEngine:
     
     def _has_price_intent(self, query: str) -> bool:
         """Check if query has price intent."""
-        price_keywords = ['euro', '€', 'prijs', 'price', 'onder', 'boven', 'tussen', 'max', 'min']
-        return any(keyword in query.lower() for keyword in price_keywords)
+        return _query_intent_flags(query)[0]
     
     def _has_category_intent(self, query: str) -> bool:
         """Check if query has category intent."""
-        category_keywords = ['categorie', 'category', 'type', 'soort', 'kleding', 'elektronica']
-        return any(keyword in query.lower() for keyword in category_keywords)
+        return _query_intent_flags(query)[1]
 
-    def _calculate_performance_metrics(self, results: List[Dict[str, Any]], query_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    def _calculate_performance_metrics(self, results: List[Dict[str, Any]], query_analysis: Dict[str, Any],
+                                       vectors: Optional[_ResultVectors] = None) -> Dict[str, Any]:
         """
         Calculate performance metrics for search results.
         
         Args:
             results: Search results
             query_analysis: Query analysis data
+            vectors: Precomputed columns for results
             
         Returns:
             Dictionary with performance metrics
@@ -614,19 +944,12 @@ class AdaptiveFilterEngine:
         if not results:
             return {}
         
-        scores = [r.get('similarity', 0) for r in results]
-        prices = [r.get('price', 0) for r in results if r.get('price')]
+        metrics = self._compute_all_metrics(results, vectors)
+        detected_intents = query_analysis.get("detected_intents") or _NO_INTENTS
+        metrics["material_intent_detected"] = "material_intent" in detected_intents
+        metrics["color_intent_detected"] = "color_intent" in detected_intents
         
-        return {
-            "avg_score": statistics.mean(scores) if scores else 0,
-            "result_count": len(results),
-            "avg_price_top5": statistics.mean(prices[:5]) if prices else 0,
-            "price_range": max(prices) - min(prices) if len(prices) > 1 else 0,
-            "category_coverage": self._calculate_category_coverage(results),
-            "diversity_score": self._calculate_diversity_score(results),
-            "material_intent_detected": "material_intent" in query_analysis.get("detected_intents", {}),
-            "color_intent_detected": "color_intent" in query_analysis.get("detected_intents", {})
-        }
+        return metrics
     
     def _identify_performance_issues(self, metrics: Dict[str, Any]) -> List[str]:
         """
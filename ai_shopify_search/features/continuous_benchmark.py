@@ -7,22 +7,26 @@ It can be run manually or via cronjob for automated monitoring.
 """
 
 import asyncio
-import json
 import logging
 import os
 import sys
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
 import argparse
 import sqlite3
-import statistics
+from dataclasses import dataclass
+from itertools import chain
+from operator import attrgetter
+
+import numpy as np
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
 
 from .enhanced_benchmark_search import EnhancedSearchBenchmarker
-from .knowledge_base_builder import KnowledgeBaseBuilder
+from .knowledge_base_builder import KnowledgeBaseBuilder, to_day_epoch
+from ai_shopify_search.utils.json_utils import json_pretty
 
 # Configure logging
 logging.basicConfig(
@@ -42,6 +46,23 @@ DEFAULT_REGRESSION_THRESHOLD = 0.1  # 10% threshold
 DEFAULT_QUERIES_FILE = "benchmark_queries.csv"
 DEFAULT_DAYS_HISTORY = 7
 DEFAULT_HISTORY_LIMIT = 5
+TREND_SLOPE_EPSILON = 1e-3  # Per-day slope below this fraction of the window mean counts as stable
+HISTORY_DB_CACHE_KIB = 65536  # SQLite page cache of the persistent history connection
+
+# Daily history per store; constant text so the persistent connection reuses the prepared statement
+BENCHMARK_HISTORY_QUERY = """
+    SELECT 
+        DATE(day_epoch * 86400, 'unixepoch') as date,
+        COUNT(*) as query_count,
+        AVG(score) as avg_score,
+        AVG(response_time) as avg_response_time,
+        AVG(price_coherence) as avg_price_coherence
+    FROM benchmark_history 
+    WHERE store_id = ? 
+    AND day_epoch >= ?
+    GROUP BY day_epoch
+    ORDER BY day_epoch DESC
+"""
 
 # Performance thresholds
 PERFORMANCE_THRESHOLDS = {
@@ -64,6 +85,44 @@ LOG_CONTEXT_STORE_ID = "store_id"
 LOG_CONTEXT_TIMESTAMP = "timestamp"
 LOG_CONTEXT_REGRESSIONS = "regressions_detected"
 
+# Current metric name -> benchmark result attribute it averages (flags average to a usage rate)
+CURRENT_METRIC_FIELDS = {
+    "avg_relevance_score": "score",
+    "avg_response_time": "response_time",
+    "avg_price_coherence": "price_coherence",
+    "avg_diversity_score": "diversity_score",
+    "price_filter_usage_rate": "price_filter_applied",
+    "fallback_usage_rate": "fallback_used",
+    "cache_hit_rate": "cache_hit",
+}
+
+@dataclass(slots=True, frozen=True)
+class BenchmarkMetrics:
+    """Aggregate metrics of a benchmark run (or the stored baseline); fields in CURRENT_METRIC_FIELDS order."""
+    avg_relevance_score: float
+    avg_response_time: float
+    avg_price_coherence: float
+    avg_diversity_score: float
+    price_filter_usage_rate: float
+    fallback_usage_rate: float
+    cache_hit_rate: float
+    
+    def to_dict(self) -> Dict[str, float]:
+        """Metrics as a plain dict (reports, alert JSON)."""
+        return {name: getattr(self, name) for name in CURRENT_METRIC_FIELDS}
+
+# Reads one result's metric columns as a tuple in CURRENT_METRIC_FIELDS order
+_result_metrics_getter = attrgetter(*CURRENT_METRIC_FIELDS.values())
+
+def _results_to_matrix(results: List) -> np.ndarray:
+    """(N, metrics) float64 matrix of the metric columns, filled in one pass (flags become 0.0/1.0)."""
+    width = len(CURRENT_METRIC_FIELDS)
+    return np.fromiter(
+        chain.from_iterable(map(_result_metrics_getter, results)),
+        dtype=np.float64,
+        count=len(results) * width
+    ).reshape(-1, width)
+
 class ContinuousBenchmarker:
     """Continuous benchmarking system with regression detection."""
     
@@ -86,10 +145,49 @@ class ContinuousBenchmarker:
         self.db_path = db_path
         self.regression_threshold = regression_threshold
         self.knowledge_builder = KnowledgeBaseBuilder(db_path)
+        # Store profiles looked up during the current run, keyed by store_id (cleared per run)
+        self._profile_cache: Dict[str, Any] = {}
+        # Search benchmarker (HTTP session) kept open across runs while used as a context manager
+        self._benchmarker: Optional[EnhancedSearchBenchmarker] = None
+        # History database connection, opened on first use and kept for the instance's lifetime
+        self._conn: Optional[sqlite3.Connection] = None
         
         # Ensure logs directory exists
         Path("logs").mkdir(exist_ok=True)
     
+    async def __aenter__(self):
+        """Open one search benchmarker that is reused by every run until exit."""
+        self._benchmarker = await self._new_search_benchmarker().__aenter__()
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Close the shared search benchmarker."""
+        if self._benchmarker is not None:
+            benchmarker, self._benchmarker = self._benchmarker, None
+            await benchmarker.__aexit__(exc_type, exc_val, exc_tb)
+        self.close()
+    
+    def _history_connection(self) -> sqlite3.Connection:
+        """Persistent connection to the history database (pragmas and statement cache survive calls)."""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(f"PRAGMA cache_size = -{HISTORY_DB_CACHE_KIB}")
+        return self._conn
+    
+    def close(self):
+        """Close the history database connection (reopened on next use)."""
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            conn.close()
+    
+    def _new_search_benchmarker(self) -> EnhancedSearchBenchmarker:
+        """Search benchmarker configured for automated runs."""
+        return EnhancedSearchBenchmarker(
+            base_url=self.base_url,
+            headless=True,  # Run in headless mode for automation
+            store_id=self.store_id
+        )
+    
     def _calculate_metric_change(self, current_value: float, baseline_value: float) -> float:
         """
         Calculate percentage change between current and baseline values.
@@ -158,6 +256,8 @@ class ContinuousBenchmarker:
                                  results_file: Optional[str] = None) -> Dict[str, any]:
         """Run daily benchmark and detect regressions."""
         timestamp = datetime.now()
+        # The previous run's knowledge base write may have changed the profile
+        self._profile_cache.clear()
         
         # Generate results filename with timestamp
         if not results_file:
@@ -165,26 +265,38 @@ class ContinuousBenchmarker:
         
         logger.info(f"🚀 Starting daily benchmark for store {self.store_id}")
         
-        # Run benchmark
-        async with EnhancedSearchBenchmarker(
-            base_url=self.base_url,
-            headless=True,  # Run in headless mode for automation
-            store_id=self.store_id
-        ) as benchmarker:
-            results = await benchmarker.run_enhanced_benchmark(
+        # Run benchmark (on the shared benchmarker when opened via `async with`)
+        if self._benchmarker is not None:
+            # Every run measures live responses, as a fresh benchmarker would
+            self._benchmarker.cache.clear()
+            results = await self._benchmarker.run_enhanced_benchmark(
                 queries_file=queries_file,
                 results_file=results_file
             )
+        else:
+            async with self._new_search_benchmarker() as benchmarker:
+                results = await benchmarker.run_enhanced_benchmark(
+                    queries_file=queries_file,
+                    results_file=results_file
+                )
+        
+        # Metrics are computed once and shared by regression detection and the run log
+        current_metrics = self._calculate_current_metrics(results)
         
         # Process results and detect regressions
-        regression_report = self._detect_regressions(results, timestamp)
+        regression_report = self._detect_regressions(results, timestamp, current_metrics)
         
-        # Save to knowledge base
+        # Knowledge base write and run log are independent: run both in worker threads concurrently
+        io_tasks = []
         if results:
-            self.knowledge_builder.process_benchmark_results(results_file, self.store_id)
-        
-        # Log results
-        self._log_benchmark_results(results, regression_report, timestamp)
+            # Straight from memory; the CSV is kept for replays via the CLI
+            io_tasks.append(asyncio.to_thread(
+                self.knowledge_builder.process_benchmark_results_inmem, results, self.store_id
+            ))
+        io_tasks.append(asyncio.to_thread(
+            self._log_benchmark_results, results, regression_report, timestamp, current_metrics
+        ))
+        await asyncio.gather(*io_tasks)
         
         return {
             "timestamp": timestamp.isoformat(),
@@ -194,22 +306,26 @@ class ContinuousBenchmarker:
             "success": True
         }
     
-    def _detect_regressions(self, results: List, timestamp: datetime) -> Dict[str, any]:
+    def _detect_regressions(self, results: List, timestamp: datetime,
+                            current_metrics: Optional[BenchmarkMetrics] = None) -> Dict[str, any]:
         """
         Detect performance regressions compared to baseline.
         
         Args:
             results: Benchmark results
             timestamp: Current timestamp
+            current_metrics: Metrics already computed for results (optional)
             
         Returns:
             Regression report
         """
-        if not results:
+        # Baselines are looked up per store, so without a store_id there is nothing to compare against
+        if not results or not self.store_id:
             return {"regressions_detected": 0, "details": []}
         
         # Calculate current metrics
-        current_metrics = self._calculate_current_metrics(results)
+        if current_metrics is None:
+            current_metrics = self._calculate_current_metrics(results)
         
         # Get baseline from knowledge base
         baseline = self._get_baseline_metrics()
@@ -222,61 +338,55 @@ class ContinuousBenchmarker:
         # Detect regressions using helper methods
         regressions = []
         
-        for metric_name, current_value in current_metrics.items():
-            if metric_name in baseline:
-                regression = self._check_metric_regression(
-                    metric_name, current_value, baseline[metric_name]
-                )
-                if regression:
-                    regressions.append(regression)
+        for metric_name in CURRENT_METRIC_FIELDS:
+            regression = self._check_metric_regression(
+                metric_name, getattr(current_metrics, metric_name), getattr(baseline, metric_name)
+            )
+            if regression:
+                regressions.append(regression)
         
         return {
             "regressions_detected": len(regressions),
             "details": regressions,
-            "current_metrics": current_metrics,
-            "baseline_metrics": baseline
+            "current_metrics": current_metrics.to_dict(),
+            "baseline_metrics": baseline.to_dict()
         }
     
-    def _calculate_current_metrics(self, results: List) -> Dict[str, float]:
+    def _calculate_current_metrics(self, results: List) -> Optional[BenchmarkMetrics]:
         """Calculate current performance metrics from benchmark results."""
         if not results:
-            return {}
-        
-        scores = [r.score for r in results]
-        response_times = [r.response_time for r in results]
-        price_coherence = [r.price_coherence for r in results]
-        diversity_scores = [r.diversity_score for r in results]
+            return None
         
-        return {
-            "avg_relevance_score": statistics.mean(scores),
-            "avg_response_time": statistics.mean(response_times),
-            "avg_price_coherence": statistics.mean(price_coherence),
-            "avg_diversity_score": statistics.mean(diversity_scores),
-            "price_filter_usage_rate": sum(1 for r in results if r.price_filter_applied) / len(results),
-            "fallback_usage_rate": sum(1 for r in results if r.fallback_used) / len(results),
-            "cache_hit_rate": sum(1 for r in results if r.cache_hit) / len(results)
-        }
+        # All seven means in one column-wise reduction
+        means = _results_to_matrix(results).mean(axis=0)
+        return BenchmarkMetrics(*means.tolist())
     
-    def _get_baseline_metrics(self) -> Optional[Dict[str, float]]:
+    def _get_baseline_metrics(self) -> Optional[BenchmarkMetrics]:
         """Get baseline metrics from knowledge base."""
         if not self.store_id:
             return None
         
-        store_profile = self.knowledge_builder.get_store_profile(self.store_id)
+        store_profile = self._get_store_profile(self.store_id)
         if not store_profile:
             return None
         
-        return {
-            "avg_relevance_score": store_profile.avg_relevance_score_baseline,
-            "avg_response_time": store_profile.avg_response_time_baseline,
-            "price_filter_usage_rate": store_profile.price_filter_usage_rate,
-            "fallback_usage_rate": store_profile.fallback_usage_rate,
-            "cache_hit_rate": store_profile.cache_hit_rate,
-            "avg_price_coherence": store_profile.avg_price_coherence,
-            "avg_diversity_score": store_profile.avg_diversity_score
-        }
+        return BenchmarkMetrics(
+            avg_relevance_score=store_profile.avg_relevance_score_baseline,
+            avg_response_time=store_profile.avg_response_time_baseline,
+            price_filter_usage_rate=store_profile.price_filter_usage_rate,
+            fallback_usage_rate=store_profile.fallback_usage_rate,
+            cache_hit_rate=store_profile.cache_hit_rate,
+            avg_price_coherence=store_profile.avg_price_coherence,
+            avg_diversity_score=store_profile.avg_diversity_score
+        )
+    
+    def _get_store_profile(self, store_id: str):
+        """Store profile from the knowledge base, looked up once per run."""
+        if store_id not in self._profile_cache:
+            self._profile_cache[store_id] = self.knowledge_builder.get_store_profile(store_id)
+        return self._profile_cache[store_id]
     
-    def _create_baseline(self, current_metrics: Dict[str, float], timestamp: datetime):
+    def _create_baseline(self, current_metrics: BenchmarkMetrics, timestamp: datetime):
         """Create new baseline from current metrics."""
         logger.info("📊 Creating new baseline from current metrics")
         
@@ -284,30 +394,36 @@ class ContinuousBenchmarker:
         # when we process the benchmark results
         pass
     
-    def _log_benchmark_results(self, results: List, regression_report: Dict, timestamp: datetime):
+    def _log_benchmark_results(self, results: List, regression_report: Dict, timestamp: datetime,
+                               current_metrics: Optional[BenchmarkMetrics] = None):
         """Log benchmark results and any regressions."""
         log_file = f"logs/benchmark_{timestamp.strftime('%Y%m%d')}.log"
         
-        with open(log_file, 'a') as f:
-            f.write(f"\n{'='*60}\n")
-            f.write(f"BENCHMARK RUN: {timestamp.isoformat()}\n")
-            f.write(f"{'='*60}\n")
-            f.write(f"Total queries: {len(results)}\n")
-            
-            if results:
+        # Build the whole block first and append it with a single write
+        lines = [
+            f"\n{'='*60}\n",
+            f"BENCHMARK RUN: {timestamp.isoformat()}\n",
+            f"{'='*60}\n",
+            f"Total queries: {len(results)}\n"
+        ]
+        
+        if results:
+            if current_metrics is None:
                 current_metrics = self._calculate_current_metrics(results)
-                f.write(f"Current metrics:\n")
-                for metric, value in current_metrics.items():
-                    f.write(f"  {metric}: {value:.3f}\n")
-            
-            f.write(f"\nRegression report:\n")
-            f.write(f"Regressions detected: {regression_report['regressions_detected']}\n")
-            
-            for regression in regression_report.get('details', []):
-                f.write(f"  {regression['metric']}: {regression['change_percentage']:.1f}% "
-                       f"({regression['severity']} severity)\n")
-            
-            f.write(f"\n")
+            lines.append("Current metrics:\n")
+            lines.extend(f"  {metric}: {value:.3f}\n" for metric, value in current_metrics.to_dict().items())
+        
+        lines.append("\nRegression report:\n")
+        lines.append(f"Regressions detected: {regression_report['regressions_detected']}\n")
+        lines.extend(
+            f"  {regression['metric']}: {regression['change_percentage']:.1f}% "
+            f"({regression['severity']} severity)\n"
+            for regression in regression_report.get('details', [])
+        )
+        lines.append("\n")
+        
+        with open(log_file, 'a', buffering=1 << 16) as f:
+            f.write(''.join(lines))
         
         # If regressions detected, create alert
         if regression_report['regressions_detected'] > 0:
@@ -327,46 +443,34 @@ class ContinuousBenchmarker:
             "severity": "high" if any(r['severity'] == 'high' for r in regression_report['details']) else "medium"
         }
         
-        with open(alert_file, 'w') as f:
-            json.dump(alert_data, f, indent=2)
+        with open(alert_file, 'wb') as f:
+            f.write(json_pretty(alert_data))
         
         logger.error(f"🚨 REGRESSION ALERT: {regression_report['regressions_detected']} regressions detected!")
         logger.error(f"Alert saved to: {alert_file}")
     
     def get_benchmark_history(self, days: int = 7) -> List[Dict]:
         """Get benchmark history for the last N days."""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute("""
-                SELECT 
-                    DATE(timestamp) as date,
-                    COUNT(*) as query_count,
-                    AVG(score) as avg_score,
-                    AVG(response_time) as avg_response_time,
-                    AVG(price_coherence) as avg_price_coherence
-                FROM benchmark_history 
-                WHERE store_id = ? 
-                AND timestamp >= DATE('now', '-{} days')
-                GROUP BY DATE(timestamp)
-                ORDER BY date DESC
-            """.format(days), (self.store_id,))
-            
-            return [
-                {
-                    "date": row[0],
-                    "query_count": row[1],
-                    "avg_score": row[2],
-                    "avg_response_time": row[3],
-                    "avg_price_coherence": row[4]
-                }
-                for row in cursor.fetchall()
-            ]
+        # Same cutoff day as DATE('now', '-N days'); grouping on the stored day avoids DATE() per row
+        cutoff_day = to_day_epoch(datetime.now(timezone.utc)) - days
+        cursor = self._history_connection().execute(BENCHMARK_HISTORY_QUERY, (self.store_id, cutoff_day))
+        return [
+            {
+                "date": row[0],
+                "query_count": row[1],
+                "avg_score": row[2],
+                "avg_response_time": row[3],
+                "avg_price_coherence": row[4]
+            }
+            for row in cursor.fetchall()
+        ]
     
     def _calculate_trend(self, values: List[float]) -> str:
         """
         Calculate trend from a list of values.
         
         Args:
-            values: List of numeric values
+            values: List of numeric values, newest first (history order)
             
         Returns:
             Trend description (improving, declining, stable)
@@ -374,9 +478,16 @@ class ContinuousBenchmarker:
         if len(values) < 2:
             return "stable"
         
-        if values[0] > values[-1]:
+        # Least-squares slope over the whole window instead of comparing the two endpoints.
+        # Values are newest first, so a negative slope means the newest values are higher.
+        series = np.asarray(values, dtype=np.float64)
+        slope = np.polyfit(np.arange(len(series)), series, 1)[0]
+        # Relative to the mean, so scores (~0-1) and response times (seconds) share one threshold
+        scale = abs(series.mean()) or 1.0
+        relative_slope = slope / scale
+        if relative_slope < -TREND_SLOPE_EPSILON:
             return "improving"
-        elif values[0] < values[-1]:
+        elif relative_slope > TREND_SLOPE_EPSILON:
             return "declining"
         else:
             return "stable"
@@ -478,10 +589,11 @@ async def main():
         print("\n" + "="*60)
     else:
         # Run daily benchmark
-        result = await benchmarker.run_daily_benchmark(
-            queries_file=args.queries,
-            results_file=args.results
-        )
+        async with benchmarker:
+            result = await benchmarker.run_daily_benchmark(
+                queries_file=args.queries,
+                results_file=args.results
+            )
         
         print("\n" + "="*60)
         print("🚀 CONTINUOUS BENCHMARK COMPLETE")
@@ -13,11 +13,11 @@ import json
 import pandas as pd
 from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass, asdict
-from datetime import datetime
+from datetime import datetime, date
 import statistics
 import logging
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, insert
 from contextlib import contextmanager
 # Import models directly to avoid circular import issues
 from ai_shopify_search.core.models import StoreProfileModel, QueryPatternModel, IntentMatrixModel, BenchmarkHistoryModel
@@ -58,6 +58,30 @@ LOG_CONTEXT_STORE_ID = "store_id"
 LOG_CONTEXT_RESULTS_FILE = "results_file"
 LOG_CONTEXT_PATTERNS_COUNT = "patterns_count"
 
+# Benchmark result columns used by the knowledge base (all stored in benchmark_history)
+BENCHMARK_RESULT_COLUMNS = [
+    "query", "score", "response_time", "result_count", "detected_intents", "complexity_score",
+    "cache_hit", "price_filter_applied", "fallback_used", "avg_price_top5", "price_coherence",
+    "diversity_score", "category_coverage", "conversion_potential", "timestamp", "store_id"
+]
+
+# Benchmark history is grouped per calendar day stored as days since 1970-01-01
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def to_day_epoch(timestamp: Any) -> Optional[int]:
+    """Calendar day of a timestamp (datetime or ISO string) as days since 1970-01-01, like DATE(timestamp)."""
+    if isinstance(timestamp, str):
+        try:
+            timestamp = datetime.fromisoformat(timestamp)
+        except ValueError:
+            return None
+    if isinstance(timestamp, (datetime, date)):
+        return timestamp.toordinal() - EPOCH_ORDINAL
+    return None
+
+# Columns accepted by the bulk insert (CSV results carry extra columns the model doesn't have)
+BENCHMARK_HISTORY_COLUMNS = frozenset(BenchmarkHistoryModel.__table__.columns.keys())
+
 @contextmanager
 def db_session():
     db = next(get_db())
@@ -177,7 +201,10 @@ class KnowledgeBaseBuilder:
     def _save_all_data(self, store_profile: StoreProfile, query_patterns: List[QueryPattern], 
                       intent_success: List[Dict[str, Any]], df: pd.DataFrame, store_id: str) -> None:
         """
-        Save all processed data to database.
+        Save all processed data to database in one transaction.
+        
+        Each part runs in its own savepoint, so a failing part is logged and
+        rolled back without losing the others.
         
         Args:
             store_profile: Store profile to save
@@ -186,10 +213,15 @@ class KnowledgeBaseBuilder:
             df: Benchmark results dataframe
             store_id: Store ID
         """
-        self._save_store_profile(store_profile)
-        self._save_query_patterns(query_patterns)
-        self._save_intent_success_matrix(intent_success)
-        self._save_benchmark_history(df, store_id)
+        try:
+            with db_session() as db:
+                self._save_store_profile(db, store_profile)
+                self._save_query_patterns(db, query_patterns)
+                self._save_intent_success_matrix(db, intent_success)
+                self._save_benchmark_history(db, df, store_id)
+                db.commit()
+        except Exception as e:
+            logger.error(f"Error committing knowledge base data: {e}")
 
     def init_database(self):
         """
@@ -205,7 +237,37 @@ class KnowledgeBaseBuilder:
     def process_benchmark_results(self, results_file: str, store_id: Optional[str] = None) -> StoreProfile:
         logger.info(f"📊 Processing benchmark results from {results_file}")
         df = pd.read_csv(results_file)
+        return self._process_results_dataframe(df, store_id)
 
+    def process_benchmark_results_inmem(self, results: List[Any], store_id: Optional[str] = None) -> StoreProfile:
+        """
+        Process benchmark results that are already in memory (no CSV round trip).
+        
+        Args:
+            results: EnhancedBenchmarkResult objects from a benchmark run
+            store_id: Optional store ID
+            
+        Returns:
+            StoreProfile object
+        """
+        logger.info(f"📊 Processing {len(results)} in-memory benchmark results")
+        df = pd.DataFrame.from_records(
+            [
+                (
+                    r.query, r.score, r.response_time, r.result_count,
+                    # Same JSON text as the CSV column, which the intent helpers parse
+                    json.dumps(r.query_analysis.detected_intents), r.query_analysis.complexity_score,
+                    r.cache_hit, r.price_filter_applied, r.fallback_used, r.avg_price_top5, r.price_coherence,
+                    r.diversity_score, r.category_coverage, r.conversion_potential, r.timestamp, r.store_id
+                )
+                for r in results
+            ],
+            columns=BENCHMARK_RESULT_COLUMNS
+        )
+        return self._process_results_dataframe(df, store_id)
+
+    def _process_results_dataframe(self, df: pd.DataFrame, store_id: Optional[str] = None) -> StoreProfile:
+        """Build and save the knowledge base entries for a results dataframe."""
         store_id = self._determine_store_id(df, store_id)
 
         store_profile = self._build_store_profile(df, store_id)
@@ -356,10 +418,10 @@ class KnowledgeBaseBuilder:
         return matrix
 
 
-    def _save_store_profile(self, profile: StoreProfile):
+    def _save_store_profile(self, db: Session, profile: StoreProfile):
         """Save store profile to the new StoreProfileModel table."""
         try:
-            with db_session() as db:
+            with db.begin_nested():
                 existing_profile = db.query(StoreProfileModel).filter(StoreProfileModel.store_id == profile.store_id).first()
                 if existing_profile:
                     # Update bestaande velden
@@ -373,13 +435,12 @@ class KnowledgeBaseBuilder:
                         k: (json.dumps(v) if isinstance(v, (dict, list)) else v)
                         for k, v in asdict(profile).items()
                     }))
-                db.commit()
         except Exception as e:
             logger.error(f"Error saving store profile: {e}")
 
-    def _save_query_patterns(self, patterns: List[QueryPattern]):
+    def _save_query_patterns(self, db: Session, patterns: List[QueryPattern]):
         try:
-            with db_session() as db:
+            with db.begin_nested():
                 for pattern in patterns:
                     existing = db.query(QueryPatternModel).filter(
                         QueryPatternModel.pattern_type == pattern.pattern_type,
@@ -391,13 +452,12 @@ class KnowledgeBaseBuilder:
                                 setattr(existing, k, v)
                     else:
                         db.add(QueryPatternModel(**asdict(pattern)))
-                db.commit()
         except Exception as e:
             logger.error(f"Error saving query patterns: {e}")
 
-    def _save_intent_success_matrix(self, matrix: List[Dict[str, Any]]):
+    def _save_intent_success_matrix(self, db: Session, matrix: List[Dict[str, Any]]):
         try:
-            with db_session() as db:
+            with db.begin_nested():
                 for entry in matrix:
                     existing = db.query(IntentMatrixModel).filter(
                         IntentMatrixModel.intent_type == entry['intent_type'],
@@ -409,27 +469,39 @@ class KnowledgeBaseBuilder:
                                 setattr(existing, k, v)
                     else:
                         db.add(IntentMatrixModel(**entry))
-                db.commit()
         except Exception as e:
             logger.error(f"Error saving intent success matrix: {e}")
 
-    def _save_benchmark_history(self, df: pd.DataFrame, store_id: str):
+    def _save_benchmark_history(self, db: Session, df: pd.DataFrame, store_id: str):
         try:
-            with db_session() as db:
-                for _, row in df.iterrows():
-                    query = row['query']
-                    existing = db.query(BenchmarkHistoryModel).filter(
-                        BenchmarkHistoryModel.store_id == store_id, 
-                        BenchmarkHistoryModel.query == query
-                    ).first()
-                    row_data = {**row.to_dict(), 'store_id': store_id, 'last_updated': datetime.now()}
+            with db.begin_nested():
+                # One lookup for all queries instead of a SELECT per row
+                existing_by_query = {}
+                for existing in db.query(BenchmarkHistoryModel).filter(
+                    BenchmarkHistoryModel.store_id == store_id,
+                    BenchmarkHistoryModel.query.in_(set(df['query']))
+                ):
+                    existing_by_query.setdefault(existing.query, existing)
+                
+                last_updated = datetime.now()
+                new_rows = []
+                for row_data in df.to_dict('records'):
+                    row_data['store_id'] = store_id
+                    row_data['last_updated'] = last_updated
+                    # Same value the model default would set; day_epoch is derived from it
+                    row_data.setdefault('timestamp', datetime.utcnow())
+                    row_data['day_epoch'] = to_day_epoch(row_data['timestamp'])
+                    existing = existing_by_query.get(row_data['query'])
                     if existing:
                         for k, v in row_data.items():
                             if hasattr(existing, k):
                                 setattr(existing, k, v)
                     else:
-                        db.add(BenchmarkHistoryModel(**row_data))
-                db.commit()
+                        new_rows.append({k: v for k, v in row_data.items() if k in BENCHMARK_HISTORY_COLUMNS})
+                
+                # Nieuwe rijen in één executemany
+                if new_rows:
+                    db.execute(insert(BenchmarkHistoryModel), new_rows)
         except Exception as e:
             logger.error(f"Error saving benchmark history: {e}")
 
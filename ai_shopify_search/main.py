@@ -1,10 +1,13 @@
 import logging
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from fastapi import FastAPI
 from sqlalchemy import text
 from fastapi import APIRouter
-from core.database import Base, engine
+from core.database import Base, engine, ensure_monthly_partitions
 from core.config import DATABASE_URL
-from api.error_handlers import error_handler_middleware
+from core.embeddings import close_async_openai_client
+from api.error_handlers import register_exception_handlers
 
 # Import routers
 from api.products_router import router as products_router
@@ -21,28 +24,103 @@ logger = logging.getLogger(__name__)
 # Create tables if they don't exist
 Base.metadata.create_all(bind=engine)
 
-# Create pgvector extension & index (only for PostgreSQL)
+# Create pgvector extension & index (only for PostgreSQL).
+# Changes to existing columns run once via core/migrations.py, not on every boot.
 if DATABASE_URL.startswith("postgresql"):
     try:
         with engine.connect() as conn:
             # Ensure vector extension exists
             conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector;"))
             
-            # Create index for fast cosine similarity (will be recreated if needed)
+            # Replace the legacy ivfflat index with an HNSW graph on the search column.
+            # Search orders by <#> (inner product; embeddings are unit length), so the graph
+            # is built with vector_ip_ops and the older cosine graph is dropped.
             conn.execute(text("DROP INDEX IF EXISTS idx_products_embedding;"))
+            conn.execute(text("DROP INDEX IF EXISTS products_emb_hnsw;"))
+            # HNSW builds are much faster when the graph fits in maintenance_work_mem
+            conn.execute(text("SET maintenance_work_mem = '2GB';"))
             conn.execute(text("""
-                CREATE INDEX IF NOT EXISTS idx_products_embedding
+                CREATE INDEX IF NOT EXISTS products_emb_hnsw_ip
                 ON products
-                USING ivfflat (embedding vector_l2_ops)
-                WITH (lists = 100);
+                USING hnsw (combined_embedding_vector vector_ip_ops);
             """))
+            conn.execute(text("RESET maintenance_work_mem;"))
             conn.commit()
             logger.info("Database setup completed successfully")
     except Exception as e:
         logger.warning(f"Database setup warning (this is normal for new installations): {e}")
 
+    # Monthly range partitions for the append-only log tables (see partitioned_by_month in core/models.py).
+    # Tables created before partitioning stay regular tables and are skipped (relkind 'p' check).
+    partitioned_tables = [table.name for table in Base.metadata.sorted_tables if "partition_key" in table.info]
+    
+    # pg_partman is optional (the pgvector image doesn't ship it); when present it owns the partition sets
+    partman_tables = set()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("CREATE SCHEMA IF NOT EXISTS partman;"))
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_partman SCHEMA partman;"))
+            for table_name in partitioned_tables:
+                conn.execute(text("""
+                    SELECT partman.create_parent(
+                        p_parent_table := :parent, p_control := 'timestamp', p_interval := '1 month'
+                    )
+                    WHERE EXISTS (SELECT 1 FROM pg_class WHERE relname = :table AND relkind = 'p')
+                      AND NOT EXISTS (SELECT 1 FROM pg_inherits i JOIN pg_class p ON p.oid = i.inhparent
+                                      WHERE p.relname = :table)
+                      AND NOT EXISTS (SELECT 1 FROM partman.part_config WHERE parent_table = :parent);
+                """), {"parent": f"public.{table_name}", "table": table_name})
+            # Premake upcoming months; schedule partman.run_maintenance() via pg_cron/bgw in production
+            conn.execute(text("SELECT partman.run_maintenance();"))
+            partman_tables = {
+                parent.split(".", 1)[1]
+                for parent in conn.execute(text("SELECT parent_table FROM partman.part_config")).scalars()
+            }
+            conn.commit()
+            logger.info(f"pg_partman managing monthly partitions for {', '.join(sorted(partman_tables)) or 'no tables'}")
+    except Exception as e:
+        logger.info(f"pg_partman not available, creating monthly partitions natively: {e}")
+    
+    # Native partitions for the current and next month; restart (or pg_partman) rolls them forward
+    today = datetime.now(timezone.utc).date()
+    for table_name in partitioned_tables:
+        if table_name in partman_tables:
+            continue
+        try:
+            with engine.connect() as conn:
+                is_partitioned = conn.execute(
+                    text("SELECT 1 FROM pg_class WHERE relname = :table AND relkind = 'p'"),
+                    {"table": table_name}
+                ).scalar()
+                if is_partitioned:
+                    created = ensure_monthly_partitions(conn, table_name, today)
+                    conn.commit()
+                    if created:
+                        logger.info(f"Created partitions {', '.join(created)}")
+        except Exception as e:
+            logger.error(f"Monthly partition setup failed for {table_name}, rows go to the DEFAULT partition: {e}")
+
+    # Load the HNSW graph and heap into shared_buffers so the first query isn't served from a cold cache.
+    # shared_buffers should fit index size + working set (see docker-compose.yml).
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_prewarm;"))
+            index_blocks = conn.execute(text("SELECT pg_prewarm('products_emb_hnsw_ip', 'buffer');")).scalar()
+            heap_blocks = conn.execute(text("SELECT pg_prewarm('products', 'buffer');")).scalar()
+            conn.commit()
+            logger.info(f"Prewarmed HNSW index ({index_blocks} blocks) and products heap ({heap_blocks} blocks)")
+    except Exception as e:
+        logger.warning(f"pg_prewarm skipped: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Release loop-bound clients when the application shuts down."""
+    yield
+    await close_async_openai_client()
+
 # FastAPI app
 app = FastAPI(
+    lifespan=lifespan,
     title="Findly - AI-Powered Shopify Search",
     description="Advanced AI-powered search platform for Shopify stores",
     version="1.0.0",
@@ -50,10 +128,8 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
-# Add error handling middleware
-@app.middleware("http")
-async def error_handling_middleware(request: Request, call_next):
-    return await error_handler_middleware(request, call_next)
+# Error responses via exception handlers (no per-request middleware)
+register_exception_handlers(app)
 
 # Routers
 app.include_router(products_router, prefix="/api/products", tags=["products"])
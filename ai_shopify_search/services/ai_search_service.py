@@ -12,7 +12,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text, func
 from ai_shopify_search.core.models import Product
 from ai_shopify_search.core.embeddings import (
-    generate_embedding, 
+    generate_embedding_async, 
     get_embedding_model, 
     generate_image_embedding
 )
@@ -79,7 +79,7 @@ class AISearchService:
         """Generate embedding with retry logic for reliability."""
         for attempt in range(self.max_retries):
             try:
-                return generate_embedding(title=query, use_case="query")
+                return await generate_embedding_async(title=query, use_case="query")
             except Exception as e:
                 if attempt == self.max_retries - 1:
                     logger.error(f"Failed to generate embedding after {self.max_retries} attempts: {e}")
@@ -152,25 +152,16 @@ class AISearchService:
             
             # Add similarity search using combined_embedding_vector
             if VECTOR_AVAILABLE and embedding_list:
-                # Convert embedding list to vector format
-                vector_str = '[' + ','.join(str(x) for x in embedding_list) + ']'
-                
-                # Use cosine similarity with combined_embedding_vector
+                # OpenAI embeddings are unit length, so inner product == cosine similarity.
+                # <#> is negative inner product: ascending order is best-first and matches the
+                # vector_ip_ops HNSW index; it skips the norm division that <=> pays per row.
+                neg_inner_product = Product.combined_embedding_vector.max_inner_product(embedding_list)
                 similarity_query = base_query.add_columns(
-                    func.cosine_similarity(
-                        Product.combined_embedding_vector,
-                        func.cast(vector_str, Vector(1536))
-                    ).label('similarity')
+                    (-neg_inner_product).label('similarity')
                 ).filter(
-                    func.cosine_similarity(
-                        Product.combined_embedding_vector,
-                        func.cast(vector_str, Vector(1536))
-                    ) >= similarity_threshold
+                    neg_inner_product <= -similarity_threshold
                 ).order_by(
-                    func.cosine_similarity(
-                        Product.combined_embedding_vector,
-                        func.cast(vector_str, Vector(1536))
-                    ).desc()
+                    neg_inner_product
                 )
                 
                 logger.info(f"🎯 [AI SEARCH] Using combined_embedding_vector similarity search with threshold: {similarity_threshold}")
@@ -530,7 +521,7 @@ class AISearchService:
                     p.title,
                     p.tags,
                     p.price,
-                    p.embedding,
+                    p.combined_embedding_vector AS embedding,
                     p.image_embedding,
                     p.created_at,
                     p.updated_at
@@ -18,10 +18,17 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text, func
 from sqlalchemy.dialects.postgresql import insert
 from ai_shopify_search.core.models import Product
-from ai_shopify_search.core.embeddings import generate_embedding, generate_batch_image_embeddings
+from ai_shopify_search.core.embeddings import (
+    generate_batch_image_embeddings,
+    request_embeddings_async,
+    generate_text_embedding_async,
+    build_embedding_text,
+    compute_embedding_fingerprint,
+    EMBEDDING_TEXT_FIELDS,
+    generate_product_embeddings_batch_async
+)
 from ai_shopify_search.core.metrics import SEARCH_REQUESTS_TOTAL, SEARCH_RESPONSE_TIME
 from ai_shopify_search.core.progress_tracker import progress_tracker
-from openai import AsyncOpenAI
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
 # Optional Sentry integration
@@ -45,6 +52,7 @@ DEFAULT_LIMIT_PER_HOST = 30
 DEFAULT_CONNECTOR_LIMIT = 100
 DEFAULT_DNS_CACHE_TTL = 300
 DEFAULT_PROGRESS_UPDATE_INTERVAL = 10
+IMPORT_EMBEDDING_MODEL = "text-embedding-3-small"
 
 # API Constants
 SHOPIFY_API_VERSION = "2024-01"
@@ -277,7 +285,6 @@ class ShopifyImportService(ImportService):
         self.circuit_breaker = CircuitBreaker()
         self.metrics = ImportMetrics()
         self.batch_size = 1  # Process each product individually to ensure all products get embeddings
-        self.openai_client = AsyncOpenAI()  # Async OpenAI client
     
     async def __aenter__(self):
         """
@@ -795,14 +802,8 @@ class ShopifyImportService(ImportService):
         logger.info(f"Processing embedding batch #{batch_number}: {len(texts)} texts")
         
         try:
-            # Use AsyncOpenAI client for batch processing
-            response = await self.openai_client.embeddings.create(
-                model="text-embedding-3-small",
-                input=texts,
-                encoding_format="float"
-            )
-            
-            embeddings = [embedding.embedding for embedding in response.data]
+            # Shared client and semaphore of the running loop; transient errors are retried with backoff
+            embeddings = await request_embeddings_async(texts, IMPORT_EMBEDDING_MODEL)
             
             logger.info(f"Successfully generated {len(embeddings)} embeddings for batch #{batch_number}")
             
@@ -828,8 +829,7 @@ class ShopifyImportService(ImportService):
             embeddings = []
             for i, text in enumerate(texts):
                 try:
-                    # Use the correct function signature (not async)
-                    embedding = generate_embedding(title=text)
+                    embedding = await generate_text_embedding_async(text, IMPORT_EMBEDDING_MODEL)
                     embeddings.append(embedding)
                     logger.debug(f"Individual embedding {i+1}/{len(texts)} successful for batch #{batch_number}")
                 except Exception as e2:
@@ -905,11 +905,15 @@ class ShopifyImportService(ImportService):
                         "status": base_stmt.excluded.status,
                         "tags": base_stmt.excluded.tags,
                         "price": base_stmt.excluded.price,
-                        "embedding": base_stmt.excluded.embedding,
-                        "image_embedding": base_stmt.excluded.image_embedding,
-                        "text_embedding": base_stmt.excluded.text_embedding,
-                        "combined_embedding": base_stmt.excluded.combined_embedding,
-                        "combined_embedding_vector": base_stmt.excluded.combined_embedding_vector,
+                        # Unchanged products (same fingerprint) arrive without embeddings: keep the stored ones
+                        "image_embedding": func.coalesce(base_stmt.excluded.image_embedding, Product.image_embedding),
+                        "text_embedding": func.coalesce(base_stmt.excluded.text_embedding, Product.text_embedding),
+                        "combined_embedding_vector": func.coalesce(
+                            base_stmt.excluded.combined_embedding_vector, Product.combined_embedding_vector
+                        ),
+                        "embedding_fingerprint": func.coalesce(
+                            base_stmt.excluded.embedding_fingerprint, Product.embedding_fingerprint
+                        ),
                         "updated_at": base_stmt.excluded.updated_at,
                     },
                 )
@@ -980,7 +984,7 @@ class ShopifyImportService(ImportService):
             
             # Get database statistics
             total_products = db.query(Product).count()
-            products_with_embeddings = db.query(Product).filter(Product.embedding.isnot(None)).count()
+            products_with_embeddings = db.query(Product).filter(Product.combined_embedding_vector.isnot(None)).count()
             products_without_embeddings = total_products - products_with_embeddings
             
             # Get column count from information_schema
@@ -1063,6 +1067,21 @@ class ShopifyImportService(ImportService):
             total_products = len(products)
             logger.info(f"Found {total_products} products in store")
 
+            # Fingerprints of what is already embedded, so unchanged products skip re-embedding
+            existing_fingerprints = {}
+            if generate_embeddings and products:
+                try:
+                    fetched_ids = [str(p.get('id', '')) for p in products]
+                    existing_fingerprints = dict(
+                        db.query(Product.shopify_id, Product.embedding_fingerprint).filter(
+                            Product.store_id == store_id,  # shopify_id is only unique within a store
+                            Product.shopify_id.in_(fetched_ids),
+                            Product.embedding_fingerprint.isnot(None)
+                        ).all()
+                    )
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not load embedding fingerprints: {e}")
+
             # 3. Prepare product dicts with O(1) lookup optimization
             products_data = []
             product_lookup = {}  # {shopify_id: product_dict} for O(1) embedding assignment
@@ -1087,34 +1106,27 @@ class ShopifyImportService(ImportService):
                     
                     # Initialize embedding fields
                     product_data.update({
-                        'embedding': None,
                         'image_embedding': None,
                         'text_embedding': None,
-                        'combined_embedding': None
+                        'combined_embedding_vector': None,
+                        'embedding_fingerprint': None
                     })
                     
                     products_data.append(product_data)
                     product_lookup[product_data['shopify_id']] = product_data  # O(1) lookup for embedding assignment
 
                     if generate_embeddings and product_data.get('title'):
-                        # Build comprehensive text for embedding
-                        from ai_shopify_search.core.embeddings import build_embedding_text
-                        embedding_text = build_embedding_text(
-                            title=product_data.get('title'),
-                            description=product_data.get('description'),
-                            vendor=product_data.get('vendor'),
-                            product_type=product_data.get('product_type'),
-                            seo_title=product_data.get('seo_title'),
-                            seo_description=product_data.get('seo_description'),
-                            product_attributes=product_data.get('product_attributes'),
-                            stock_status=product_data.get('stock_status'),
-                            sku=product_data.get('sku'),
-                            barcode=product_data.get('barcode'),
-                            status=product_data.get('status'),
-                            tags=product_data.get('tags'),
-                            price=product_data.get('price')
+                        fingerprint = compute_embedding_fingerprint(
+                            product_data,
+                            image_url=image_url if generate_image_embeddings else None,
+                            store_id=store_id
                         )
-                        texts_for_embeddings.append((product_data['shopify_id'], embedding_text))
+                        # Only changed products are (re)embedded; the upsert keeps stored embeddings otherwise
+                        if existing_fingerprints.get(product_data['shopify_id']) != fingerprint:
+                            embedding_text = build_embedding_text(
+                                **{field: product_data.get(field) for field in EMBEDDING_TEXT_FIELDS}
+                            )
+                            texts_for_embeddings.append((product_data['shopify_id'], embedding_text, fingerprint))
                     
                     imported_count += 1
 
@@ -1129,65 +1141,46 @@ class ShopifyImportService(ImportService):
                     if import_id:
                         await progress_tracker.add_error(import_id, error_msg)
 
-            # 4. Generate comprehensive embeddings with new function
-            if generate_embeddings and products_data:
+            # 4. Generate embeddings for new/changed products in batches
+            if generate_embeddings and texts_for_embeddings:
                 await self._progress_step(import_id, imported_count, "Generating comprehensive embeddings...")
-                logger.info(f"Generating comprehensive embeddings for {len(products_data)} products")
-                
-                from ai_shopify_search.core.embeddings import generate_embedding
+                skipped = sum(1 for p in products_data if p.get('title')) - len(texts_for_embeddings)
+                logger.info(f"Generating embeddings for {len(texts_for_embeddings)} changed products ({skipped} unchanged, skipped)")
                 
-                for i, product_data in enumerate(products_data):
+                for start in range(0, len(texts_for_embeddings), DEFAULT_BATCH_SIZE):
+                    batch = texts_for_embeddings[start:start + DEFAULT_BATCH_SIZE]
                     try:
-                        if product_data.get('title'):
-                            # Generate comprehensive embeddings using new function
-                            embeddings = generate_embedding(
-                                title=product_data.get('title'),
-                                description=product_data.get('description'),
-                                vendor=product_data.get('vendor'),
-                                product_type=product_data.get('product_type'),
-                                seo_title=product_data.get('seo_title'),
-                                seo_description=product_data.get('seo_description'),
-                                product_attributes=product_data.get('product_attributes'),
-                                stock_status=product_data.get('stock_status'),
-                                sku=product_data.get('sku'),
-                                barcode=product_data.get('barcode'),
-                                status=product_data.get('status'),
-                                tags=product_data.get('tags'),
-                                price=product_data.get('price'),
-                                image_url=product_data.get('image_url') if generate_image_embeddings else None,
-                                store_id=store_id
-                            )
-                            
-                            # Assign all embedding types
-                            product_data['text_embedding'] = embeddings.get('text_embedding')
-                            product_data['image_embedding'] = embeddings.get('image_embedding')
-                            product_data['combined_embedding'] = embeddings.get('combined_embedding')
-                            product_data['embedding'] = embeddings.get('combined_embedding') or embeddings.get('text_embedding')  # Backward compatibility
-                            
-                            # Convert combined_embedding to vector format for AI search
-                            combined_embedding = embeddings.get('combined_embedding')
-                            if combined_embedding and isinstance(combined_embedding, list):
-                                try:
-                                    # Convert list to vector format (comma-separated string)
-                                    vector_str = '[' + ','.join(str(x) for x in combined_embedding) + ']'
-                                    product_data['combined_embedding_vector'] = vector_str
-                                    logger.debug(f"✅ Converted combined_embedding to vector for product {product_data.get('shopify_id', 'unknown')}")
-                                except Exception as e:
-                                    logger.warning(f"⚠️ Failed to convert combined_embedding to vector for product {product_data.get('shopify_id', 'unknown')}: {e}")
-                                    product_data['combined_embedding_vector'] = None
-                            else:
-                                product_data['combined_embedding_vector'] = None
-                        
-                        if import_id and i % 10 == 0:
-                            await self._progress_step(import_id, imported_count + i, f"Generated embeddings for {i+1}/{len(products_data)} products...")
-                    
+                        batch_embeddings = await generate_product_embeddings_batch_async(
+                            [embedding_text for _, embedding_text, _ in batch],
+                            [
+                                product_lookup[shopify_id].get('image_url') if generate_image_embeddings else None
+                                for shopify_id, _, _ in batch
+                            ],
+                            store_id=store_id
+                        )
                     except Exception as e:
-                        error_msg = f"Failed to generate embeddings for product {product_data.get('shopify_id', 'unknown')}: {e}"
+                        # Embeddings and fingerprints stay NULL, so these products are retried on the next sync
+                        error_msg = f"Failed to generate embeddings for products {batch[0][0]}..{batch[-1][0]}: {e}"
                         logger.error(error_msg)
                         if import_id:
                             await progress_tracker.add_warning(import_id, error_msg)
+                        continue
+                    
+                    for (shopify_id, _, fingerprint), embeddings in zip(batch, batch_embeddings):
+                        product_data = product_lookup[shopify_id]
+                        product_data['text_embedding'] = embeddings.get('text_embedding')
+                        product_data['image_embedding'] = embeddings.get('image_embedding')
+                        
+                        # The combined embedding is only stored in the vector column used by AI search
+                        combined_embedding = embeddings.get('combined_embedding')
+                        if combined_embedding and isinstance(combined_embedding, list):
+                            product_data['combined_embedding_vector'] = combined_embedding
+                            product_data['embedding_fingerprint'] = fingerprint
+                    
+                    if import_id:
+                        await self._progress_step(import_id, imported_count + start + len(batch), f"Generated embeddings for {start + len(batch)}/{len(texts_for_embeddings)} products...")
                 
-                logger.info(f"✅ Generated comprehensive embeddings for {len(products_data)} products")
+                logger.info(f"✅ Generated comprehensive embeddings for {len(texts_for_embeddings)} products")
 
             # 5. Bulk upsert
             await self._progress_step(import_id, total_products, "Saving products to database...")
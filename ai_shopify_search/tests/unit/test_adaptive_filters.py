@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Snapshot-style tests for features/adaptive_filters.py on fixed result lists.
+"""
+
+import math
+import pytest
+import numpy as np
+
+from ai_shopify_search.features.adaptive_filters import AdaptiveFilterEngine, FilterStrategy
+
+
+def result(similarity, price=None, tags=None, **extra):
+    """Search result dict; price/tags are left out entirely when None."""
+    item = {"id": extra.pop("id", None), "similarity": similarity, **extra}
+    if price is not None:
+        item["price"] = price
+    if tags is not None:
+        item["tags"] = tags
+    return item
+
+
+# Few, weak results: missing/None/zero prices and untagged results
+POOR_RESULTS = [
+    result(0.5, price=20, tags=["Zwarte jurk", "UrbanWear"], id=1),
+    result(0.4, price=None, tags=[], id=2),
+    {"id": 3, "similarity": 0.3, "price": None},
+    result(0.3, price=0, tags=["katoen"], id=4),
+]
+
+# Expensive results where the 150-500 price window drops the weakest matches
+EXPENSIVE_RESULTS = [
+    result(0.2, price=300, id=1),
+    result(0.3, price=300, id=2),
+    result(0.4, price=400, id=3),
+    result(0.1, price=900, id=4),
+    result(0.1, id=5),
+]
+
+# Plenty of strong results (untagged: the healthy path never scans tags)
+HEALTHY_RESULTS = [result(0.9, price=50, id=i) for i in range(15)]
+
+QUERY_ANALYSIS = {"query": "zwarte jurk", "detected_intents": {"color_intent": 1}}
+
+
+@pytest.fixture
+def engine():
+    return AdaptiveFilterEngine()
+
+
+class TestAnalyzeSearchPerformance:
+    """Test analyze_search_performance."""
+
+    def test_no_results(self, engine):
+        assert engine.analyze_search_performance([], QUERY_ANALYSIS) == {
+            "needs_improvement": True,
+            "issues": ["no_results"],
+            "metrics": {}
+        }
+
+    def test_poor_results(self, engine):
+        """Missing, None and zero prices don't count towards the price metrics."""
+        analysis = engine.analyze_search_performance(POOR_RESULTS, QUERY_ANALYSIS)
+        assert analysis["issues"] == ["low_relevance", "insufficient_results", "low_category_coverage", "low_diversity"]
+        assert analysis["needs_improvement"] is True
+        assert analysis["metrics"] == pytest.approx({
+            "avg_score": 0.375,
+            "result_count": 4,
+            "avg_price_top5": 20.0,
+            "price_range": 0,
+            "category_coverage": 0.25,         # "Zwarte jurk" is a category (category wins over color)
+            "diversity_score": 2 / 12,         # 1 category + 1 brand + 0 colors over 3 * 4 results
+            "material_intent_detected": False,
+            "color_intent_detected": True
+        })
+
+    def test_expensive_results(self, engine):
+        analysis = engine.analyze_search_performance(EXPENSIVE_RESULTS, {"query": "jas"})
+        assert analysis["metrics"] == pytest.approx({
+            "avg_score": 0.22,
+            "result_count": 5,
+            "avg_price_top5": 475.0,           # Mean of the four priced results
+            "price_range": 600.0,
+            "category_coverage": 0.0,
+            "diversity_score": 0.0,
+            "material_intent_detected": False,
+            "color_intent_detected": False
+        })
+        assert analysis["issues"] == ["low_relevance", "low_category_coverage", "low_diversity"]
+
+    def test_healthy_short_circuit(self, engine):
+        """Healthy result sets return the reduced metrics without coverage/diversity."""
+        analysis = engine.analyze_search_performance(HEALTHY_RESULTS, QUERY_ANALYSIS)
+        assert analysis == {
+            "needs_improvement": False,
+            "issues": [],
+            "metrics": {
+                "avg_score": pytest.approx(0.9),
+                "result_count": 15,
+                "material_intent_detected": False,
+                "color_intent_detected": True
+            }
+        }
+
+
+class TestSelectAdaptiveStrategies:
+    """Test select_adaptive_strategies and the bounds table behind it."""
+
+    def test_poor_results(self, engine):
+        analysis = engine.analyze_search_performance(POOR_RESULTS, QUERY_ANALYSIS)
+        assert [s.name for s in engine.select_adaptive_strategies(analysis)] == ["price_broaden_low", "category_broaden"]
+
+    def test_expensive_results(self, engine):
+        """Selection order is priority, then success rate; capped at max_strategies_per_query."""
+        analysis = engine.analyze_search_performance(EXPENSIVE_RESULTS, {"query": "jas"})
+        assert [s.name for s in engine.select_adaptive_strategies(analysis)] == [
+            "price_broaden_high", "category_broaden", "diversity_improve"
+        ]
+        engine.max_strategies_per_query = 1
+        assert [s.name for s in engine.select_adaptive_strategies(analysis)] == ["price_broaden_high"]
+
+    def test_healthy_results(self, engine):
+        analysis = engine.analyze_search_performance(HEALTHY_RESULTS, QUERY_ANALYSIS)
+        assert engine.select_adaptive_strategies(analysis) == []
+
+    def test_missing_and_nan_metrics_never_fail(self, engine):
+        """Metrics that are absent (the strategies' "score" key) or NaN don't exclude a strategy."""
+        metrics = {"avg_price_top5": 20, "result_count": 4, "category_coverage": 0.25, "diversity_score": math.nan}
+        names = [s.name for s in engine._matching_strategies(metrics)]
+        assert names == ["price_broaden_low", "category_broaden"]
+
+    def test_bounds_are_inclusive(self, engine):
+        metrics = {"avg_price_top5": 50, "result_count": 5, "category_coverage": 0.3, "diversity_score": 0.4, "score": 0.6}
+        assert [s.name for s in engine._matching_strategies(metrics)] == ["price_broaden_low", "category_broaden", "diversity_improve"]
+
+    def test_non_numeric_conditions_use_predicates(self, engine):
+        """
+        Strategies with non-numeric conditions stay out of the table and match by predicate;
+        a non-numeric metric value can't be encoded at all, so every strategy uses its predicate.
+        """
+        engine.filter_strategies.append(FilterStrategy(
+            name="sale_segment",
+            trigger_conditions={"segment": "sale", "result_count": {"min": 0, "max": 10}},
+            filter_actions={"broaden_search": True},
+            priority=0,
+            success_rate=0.9,
+            usage_count=0
+        ))
+        engine._resort_strategies()
+        base = {"avg_price_top5": 0, "result_count": 4, "category_coverage": 0.5, "diversity_score": 0.5}
+        assert [s.name for s in engine._matching_strategies(base)] == ["sale_segment", "price_broaden_low"]
+        assert engine._matching_strategies({**base, "segment": "sale"}) is None
+        analysis = {"needs_improvement": True, "issues": [], "metrics": {**base, "segment": "outlet"}}
+        assert [s.name for s in engine.select_adaptive_strategies(analysis)] == ["price_broaden_low"]
+
+
+class TestApplyAdaptiveFilters:
+    """Test apply_adaptive_filters."""
+
+    def test_healthy_results_unchanged(self, engine):
+        outcome = engine.apply_adaptive_filters(HEALTHY_RESULTS, QUERY_ANALYSIS, None)
+        assert outcome.reasoning == "No improvement needed"
+        assert outcome.improved_results is None
+        assert outcome.final_results is HEALTHY_RESULTS
+
+    def test_no_change_is_too_small(self, engine):
+        """The price window keeps every (price or 0) result, so nothing counts as applied."""
+        outcome = engine.apply_adaptive_filters(POOR_RESULTS, QUERY_ANALYSIS, None)
+        assert outcome.applied_strategies == []
+        assert outcome.improvement_score == 0.0
+        assert outcome.reasoning == "Improvement too small (0.000 < 0.1)"
+        assert outcome.final_results is POOR_RESULTS
+        assert all(s.usage_count == 0 for s in engine.filter_strategies)
+
+    def test_price_filter_and_greedy_stop(self, engine):
+        """Zero/missing prices are excluded by the window; the first sufficient strategy stops the loop."""
+        outcome = engine.apply_adaptive_filters(EXPENSIVE_RESULTS, {"query": "jas"}, None)
+        assert [r["id"] for r in outcome.final_results] == [1, 2, 3]
+        assert outcome.applied_strategies == ["price_broaden_high"]
+        # avg score 0.22 -> 0.3 (+36.4%), result count only drops (0): mean of the two
+        assert outcome.improvement_score == pytest.approx((0.3 / 0.22 - 1) / 2)
+        assert outcome.filters_applied == {"price_range": {"min": 150, "max": 500}, "broaden_search": True}
+        assert outcome.reasoning == "Applied 1 strategies: price_broaden_high"
+        usage = {s.name: s.usage_count for s in engine.filter_strategies}
+        assert usage == {"price_broaden_low": 0, "price_broaden_high": 1, "category_broaden": 0, "diversity_improve": 0}
+
+    def test_precomputed_analysis_matches(self, engine):
+        """Passing analysis and strategies in gives the same outcome as recomputing them."""
+        analysis = engine.analyze_search_performance(EXPENSIVE_RESULTS, {"query": "jas"})
+        strategies = engine.select_adaptive_strategies(analysis)
+        precomputed = engine.apply_adaptive_filters(
+            EXPENSIVE_RESULTS, {"query": "jas"}, None, performance_analysis=analysis, strategies=strategies
+        )
+        recomputed = AdaptiveFilterEngine().apply_adaptive_filters(EXPENSIVE_RESULTS, {"query": "jas"}, None)
+        assert precomputed.final_results == recomputed.final_results
+        assert precomputed.improvement_score == pytest.approx(recomputed.improvement_score)
+
+    def test_force_diversity_picks(self, engine):
+        """Evenly spaced picks across the list, first and last included."""
+        results = [result(0.5, id=i) for i in range(10)]
+        assert [r["id"] for r in engine._force_diversity(results, 3)] == [0, 4, 9]
+        assert [r["id"] for r in engine._force_diversity(results, 4)] == [0, 3, 6, 9]
+        assert [r["id"] for r in engine._force_diversity(results, 1)] == [0]
+        short = results[:3]
+        assert engine._force_diversity(short, 3) is short
+
+
+class TestImprovementScoreBatch:
+    """Test improvement_score_batch."""
+
+    def test_matches_pairwise_scores(self, engine):
+        filtered = EXPENSIVE_RESULTS[:3]
+        tagged = [result(0.5, tags=["jas", "UrbanWear"]), result(0.5, tags=["rood"])]
+        more_tagged = tagged + [result(0.9, tags=["schoenen", "wit"])]
+        pairs = [
+            (EXPENSIVE_RESULTS, filtered),
+            (filtered, EXPENSIVE_RESULTS),
+            (tagged, more_tagged),
+            (POOR_RESULTS, POOR_RESULTS),
+            ([], filtered),
+            (filtered, []),
+        ]
+        scores = engine.improvement_score_batch(pairs)
+        expected = [engine._calculate_improvement_score(original, improved) for original, improved in pairs]
+        assert isinstance(scores, np.ndarray)
+        assert scores.tolist() == pytest.approx(expected)
+        assert scores[0] == pytest.approx((0.3 / 0.22 - 1) / 2)
+        assert scores[3:].tolist() == [0.0, 0.0, 0.0]
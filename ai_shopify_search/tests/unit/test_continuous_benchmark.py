@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Tests for the benchmark history paths of features/continuous_benchmark.py and
+features/knowledge_base_builder.py on a temporary SQLite database.
+"""
+
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+# continuous_benchmark logs to logs/continuous_benchmark.log from import time on
+Path("logs").mkdir(exist_ok=True)
+
+from ai_shopify_search.core.models import Base, BenchmarkHistoryModel
+from ai_shopify_search.features import knowledge_base_builder
+from ai_shopify_search.features.continuous_benchmark import ContinuousBenchmarker
+from ai_shopify_search.features.knowledge_base_builder import KnowledgeBaseBuilder, to_day_epoch
+
+STORE_ID = "demo-store"
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """Temporary SQLite knowledge base; the builder's sessions are bound to it."""
+    path = tmp_path / "knowledge_base.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setattr(knowledge_base_builder, "get_db", get_db)
+    monkeypatch.chdir(tmp_path)
+    yield str(path)
+    engine.dispose()
+
+
+@pytest.fixture
+def benchmarker(db_path):
+    benchmarker = ContinuousBenchmarker(store_id=STORE_ID, db_path=db_path)
+    yield benchmarker
+    benchmarker.close()
+
+
+def history_row(query, days_ago, score, response_time, price_coherence=0.5, store_id=STORE_ID):
+    timestamp = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days_ago)
+    return {
+        "store_id": store_id, "query": query, "score": score, "response_time": response_time,
+        "price_coherence": price_coherence, "timestamp": timestamp, "day_epoch": to_day_epoch(timestamp)
+    }
+
+
+def benchmark_result(query, score, response_time, timestamp, **overrides):
+    """In-memory result with the attributes process_benchmark_results_inmem reads."""
+    values = {
+        "query": query, "score": score, "response_time": response_time, "result_count": 10,
+        "query_analysis": SimpleNamespace(detected_intents={"color_intent": ["zwart"]}, complexity_score=0.4),
+        "cache_hit": False, "price_filter_applied": True, "fallback_used": False, "avg_price_top5": 49.95,
+        "price_coherence": 0.8, "diversity_score": 0.6, "category_coverage": 0.5, "conversion_potential": 0.7,
+        "timestamp": timestamp, "store_id": STORE_ID
+    }
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+class TestGetBenchmarkHistory:
+    """Test get_benchmark_history."""
+
+    def test_daily_aggregates_newest_first(self, db_path, benchmarker):
+        """Rows are grouped per stored day; older days and other stores are left out."""
+        engine = create_engine(f"sqlite:///{db_path}")
+        with engine.begin() as conn:
+            conn.execute(insert(BenchmarkHistoryModel), [
+                history_row("jurk", 0, 0.8, 1.0, 0.6),
+                history_row("jas", 0, 0.6, 2.0, 0.4),
+                history_row("broek", 2, 0.5, 1.5),
+                history_row("rok", 7, 0.4, 3.0),     # Cutoff day is included
+                history_row("sjaal", 8, 0.9, 0.5),   # Just before the window
+                history_row("jurk", 0, 0.1, 9.0, store_id="other-store"),
+            ])
+        engine.dispose()
+
+        today = datetime.now(timezone.utc).date()
+        history = benchmarker.get_benchmark_history(days=7)
+        assert [entry["date"] for entry in history] == [
+            today.isoformat(), (today - timedelta(days=2)).isoformat(), (today - timedelta(days=7)).isoformat()
+        ]
+        assert [entry["query_count"] for entry in history] == [2, 1, 1]
+        assert history[0]["avg_score"] == pytest.approx(0.7)
+        assert history[0]["avg_response_time"] == pytest.approx(1.5)
+        assert history[0]["avg_price_coherence"] == pytest.approx(0.5)
+
+    def test_empty_history(self, benchmarker):
+        assert benchmarker.get_benchmark_history(days=7) == []
+
+
+class TestCalculateTrend:
+    """Test _calculate_trend; values are newest first, so a falling series means rising values."""
+
+    @pytest.mark.parametrize("values, trend", [
+        ([0.9, 0.8, 0.7, 0.6], "improving"),       # Scores going up over time
+        ([0.6, 0.7, 0.8, 0.9], "declining"),
+        ([0.8, 0.8, 0.8, 0.8], "stable"),
+        ([0.7, 0.9, 0.9, 0.7], "stable"),           # Symmetric window, slope 0
+        ([0.8], "stable"),
+        ([], "stable"),
+    ])
+    def test_scores(self, benchmarker, values, trend):
+        assert benchmarker._calculate_trend(values) == trend
+
+    @pytest.mark.parametrize("values, trend", [
+        ([1.2, 1.5, 1.8, 2.1], "declining"),        # Response times falling over time
+        ([2.1, 1.8, 1.5, 1.2], "improving"),
+        ([1.5, 1.5, 1.5], "stable"),
+        ([1.5001, 1.5, 1.4999], "stable"),          # Below the relative epsilon
+    ])
+    def test_response_times(self, benchmarker, values, trend):
+        """Same direction rule as scores; callers interpret the label per metric."""
+        assert benchmarker._calculate_trend(values) == trend
+
+    def test_zero_mean(self, benchmarker):
+        """An all-zero window doesn't divide by zero."""
+        assert benchmarker._calculate_trend([0.0, 0.0, 0.0]) == "stable"
+
+
+class TestProcessBenchmarkResultsInmem:
+    """Test process_benchmark_results_inmem followed by reading the history back."""
+
+    def test_round_trip(self, db_path, benchmarker):
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        results = [
+            benchmark_result("zwarte jurk", 0.8, 1.0, now),
+            benchmark_result("rode jas", 0.6, 2.0, now, cache_hit=True),
+            benchmark_result("blauwe broek", 0.4, 3.0, now - timedelta(days=1), price_filter_applied=False),
+        ]
+
+        builder = KnowledgeBaseBuilder(db_path)
+        profile = builder.process_benchmark_results_inmem(results)
+
+        assert profile.store_id == STORE_ID
+        assert profile.avg_relevance_score_baseline == pytest.approx(0.6)
+        assert profile.avg_response_time_baseline == pytest.approx(2.0)
+        assert profile.cache_hit_rate == pytest.approx(1 / 3)
+        assert profile.price_filter_usage_rate == pytest.approx(2 / 3)
+
+        history = benchmarker.get_benchmark_history(days=7)
+        assert [(entry["date"], entry["query_count"]) for entry in history] == [
+            (now.date().isoformat(), 2), ((now - timedelta(days=1)).date().isoformat(), 1)
+        ]
+        assert history[0]["avg_score"] == pytest.approx(0.7)
+        assert history[1]["avg_response_time"] == pytest.approx(3.0)
+
+    def test_rerun_updates_existing_queries(self, db_path, benchmarker):
+        """A second run over the same queries updates their rows instead of adding new ones."""
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        builder = KnowledgeBaseBuilder(db_path)
+        builder.process_benchmark_results_inmem([benchmark_result("zwarte jurk", 0.5, 1.0, now)])
+        builder.process_benchmark_results_inmem([benchmark_result("zwarte jurk", 0.9, 1.0, now)])
+
+        history = benchmarker.get_benchmark_history(days=7)
+        assert [entry["query_count"] for entry in history] == [1]
+        assert history[0]["avg_score"] == pytest.approx(0.9)
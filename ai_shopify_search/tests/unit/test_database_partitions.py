@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Tests for the native monthly partition helpers in core/database.py.
+"""
+
+from datetime import date
+
+from ai_shopify_search.core.database import monthly_partition_ranges
+
+
+class TestMonthlyPartitionRanges:
+    """Test monthly_partition_ranges."""
+
+    def test_current_and_next_month(self):
+        """Default covers the current month and the next one, end exclusive."""
+        assert monthly_partition_ranges(date(2024, 3, 15)) == [
+            ("y2024m03", date(2024, 3, 1), date(2024, 4, 1)),
+            ("y2024m04", date(2024, 4, 1), date(2024, 5, 1)),
+        ]
+
+    def test_year_rollover(self):
+        """December rolls over into January of the next year."""
+        assert monthly_partition_ranges(date(2024, 12, 31), months_ahead=2) == [
+            ("y2024m12", date(2024, 12, 1), date(2025, 1, 1)),
+            ("y2025m01", date(2025, 1, 1), date(2025, 2, 1)),
+            ("y2025m02", date(2025, 2, 1), date(2025, 3, 1)),
+        ]
+
+    def test_ranges_are_contiguous(self):
+        """Each range starts where the previous one ended."""
+        ranges = monthly_partition_ranges(date(2023, 11, 1), months_ahead=5)
+        assert all(prev[2] == cur[1] for prev, cur in zip(ranges, ranges[1:]))
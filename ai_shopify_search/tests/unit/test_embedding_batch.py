@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the batch embedding paths used by product imports.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from ai_shopify_search.core import embeddings
+
+
+class FakeBinaryCache:
+    """In-memory stand-in for the CacheManager bytes API."""
+
+    def __init__(self):
+        self.store = {}
+        self.mget_calls = 0
+        self.mset_calls = 0
+
+    def get_cached_bytes(self, cache_key):
+        return self.store.get(cache_key)
+
+    def set_cached_bytes(self, cache_key, data, ttl=None):
+        self.store[cache_key] = data
+
+    def get_cached_bytes_many(self, cache_keys):
+        self.mget_calls += 1
+        return [self.store.get(cache_key) for cache_key in cache_keys]
+
+    def set_cached_bytes_many(self, items, ttl=None):
+        self.mset_calls += 1
+        self.store.update(items)
+
+
+def fake_vector(text):
+    """Deterministic float32-exact embedding per text."""
+    return [float(len(text)), 0.5, -0.25]
+
+
+@pytest.fixture
+def fake_cache():
+    cache = FakeBinaryCache()
+    with patch.object(embeddings, "cache_manager", cache):
+        yield cache
+
+
+class TestProductEmbeddingsBatch:
+    """Test generate_product_embeddings_batch_async cache behaviour."""
+
+    @pytest.mark.asyncio
+    async def test_only_misses_are_generated(self, fake_cache):
+        """Cached texts skip OpenAI; new vectors are written back in one round trip."""
+        model = embeddings.get_embedding_model("product")
+        embeddings.store_product_embedding("cached product", model, fake_vector("cached product"))
+
+        async def generate(texts, model=None):
+            return [fake_vector(text) for text in texts]
+
+        with patch.object(embeddings, "generate_batch_embeddings_async", AsyncMock(side_effect=generate)) as mock_generate:
+            results = await embeddings.generate_product_embeddings_batch_async(
+                ["new product", "cached product", "other product"], [None, None, None]
+            )
+
+        mock_generate.assert_awaited_once_with(["new product", "other product"], model)
+        assert [r["text_embedding"] for r in results] == [
+            fake_vector("new product"), fake_vector("cached product"), fake_vector("other product")
+        ]
+        assert [r["combined_embedding"] for r in results] == [r["text_embedding"] for r in results]
+        assert fake_cache.mget_calls == 1
+        assert fake_cache.mset_calls == 1
+        assert embeddings.get_cached_product_embedding("other product", model) == fake_vector("other product")
+
+    @pytest.mark.asyncio
+    async def test_retried_run_hits_cache(self, fake_cache):
+        """A second run over the same texts makes no OpenAI call at all."""
+        texts = [f"product {i}" for i in range(5)]
+
+        async def generate(texts, model=None):
+            return [fake_vector(text) for text in texts]
+
+        with patch.object(embeddings, "generate_batch_embeddings_async", AsyncMock(side_effect=generate)) as mock_generate:
+            first = await embeddings.generate_product_embeddings_batch_async(texts, [None] * 5)
+            second = await embeddings.generate_product_embeddings_batch_async(texts, [None] * 5)
+
+        assert mock_generate.await_count == 1
+        assert second == first
+
+
+class FakeEmbeddingsAPI:
+    """AsyncOpenAI.embeddings stand-in that fails a given number of times first."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = []
+
+    async def create(self, model, input):
+        self.calls.append(input)
+        if len(self.calls) <= self.failures:
+            raise RuntimeError("429 Too Many Requests")
+        data = [type("Item", (), {"embedding": fake_vector(text)}) for text in input]
+        return type("Response", (), {"data": data})
+
+
+@pytest.fixture
+def no_backoff():
+    """Retry immediately instead of sleeping between attempts."""
+    from tenacity import wait_none
+    with patch.object(embeddings.request_embeddings_async.retry, "wait", wait_none()):
+        yield
+
+
+def fake_client(api):
+    return type("Client", (), {"embeddings": api})()
+
+
+class TestBatchRetries:
+    """Test that batch requests are retried before falling back to per-text calls."""
+
+    @pytest.mark.asyncio
+    async def test_transient_error_retried_as_batch(self, no_backoff):
+        """One 429 is retried as the same batch request; no per-text fallback."""
+        api = FakeEmbeddingsAPI(failures=1)
+        texts = ["a", "bb", "ccc"]
+        with patch.object(embeddings, "get_async_openai_client", return_value=fake_client(api)), \
+                patch.object(embeddings, "generate_text_embedding_async", AsyncMock()) as mock_single:
+            result = await embeddings.generate_batch_embeddings_async(texts, "model")
+
+        assert result == [fake_vector(text) for text in texts]
+        assert api.calls == [texts, texts]
+        mock_single.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_fallback_after_retries_exhausted(self, no_backoff):
+        """Only after three failed batch attempts is each text requested on its own."""
+        api = FakeEmbeddingsAPI(failures=3)
+        texts = ["a", "bb"]
+
+        async def single(text, model=None):
+            return fake_vector(text)
+
+        with patch.object(embeddings, "get_async_openai_client", return_value=fake_client(api)), \
+                patch.object(embeddings, "generate_text_embedding_async", AsyncMock(side_effect=single)) as mock_single:
+            result = await embeddings.generate_batch_embeddings_async(texts, "model")
+
+        assert api.calls == [texts, texts, texts]
+        assert mock_single.await_count == 2
+        assert result == [fake_vector(text) for text in texts]
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Tests for api/error_handlers.py - exception handler responses and parameter validation.
+"""
+
+import json
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError, OperationalError
+from redis.exceptions import RedisError
+
+from ai_shopify_search.api.error_handlers import (
+    register_exception_handlers, validate_search_parameters, validate_analytics_parameters,
+    DatabaseConnectionError, RateLimitExceededError, ValidationError,
+    _is_ymd
+)
+from ai_shopify_search.utils.error_handling import handle_errors
+
+RAISED = {
+    "validation": ValidationError("Bad page"),
+    "rate_limit": RateLimitExceededError("Slow down"),
+    "search_api": DatabaseConnectionError(),
+    "operational": OperationalError("SELECT 1", {}, Exception("connection refused")),
+    "integrity": IntegrityError("INSERT", {}, Exception("duplicate key")),
+    "database": SQLAlchemyError("boom"),
+    "redis": RedisError("down"),
+    "generic": RuntimeError("unexpected"),
+}
+
+@pytest.fixture(scope="module")
+def client():
+    """App whose routes raise each exception type the handlers cover."""
+    app = FastAPI()
+    register_exception_handlers(app)
+
+    @app.get("/raise/{kind}")
+    async def raise_error(kind: str):
+        raise RAISED[kind]
+
+    @app.get("/ok")
+    async def ok():
+        return {"status": "ok"}
+
+    # Unhandled exceptions are re-raised by Starlette after the handler responded
+    return TestClient(app, raise_server_exceptions=False)
+
+class TestRegisterExceptionHandlers:
+    """Test status codes and body shape of the registered handlers."""
+
+    @pytest.mark.parametrize("kind, status_code, error_code, detail", [
+        ("validation", 400, "VALIDATION_ERROR", "Bad page"),
+        ("rate_limit", 429, "RATE_LIMIT_EXCEEDED", "Slow down"),
+        ("search_api", 500, "INTERNAL_ERROR", "An unexpected error occurred"),
+        ("operational", 503, "DB_CONNECTION_ERROR", "Database is temporarily unavailable"),
+        ("integrity", 400, "DB_INTEGRITY_ERROR", "Invalid data provided"),
+        ("database", 500, "DB_ERROR", "An unexpected database error occurred"),
+        ("redis", 500, "CACHE_ERROR", "Cache service is temporarily unavailable"),
+        ("generic", 500, "INTERNAL_ERROR", "An unexpected error occurred"),
+    ])
+    def test_error_response(self, client, kind, status_code, error_code, detail):
+        """Each exception type maps to its status code and a JSON error body."""
+        response = client.get(f"/raise/{kind}")
+        assert response.status_code == status_code
+        assert response.headers["content-type"] == "application/json"
+        body = response.json()
+        assert list(body) == ["error", "error_code", "detail", "context"]
+        assert body["error_code"] == error_code
+        assert body["detail"] == detail
+        assert body["context"] == {"endpoint": f"/raise/{kind}"}
+
+    def test_successful_request_untouched(self, client):
+        """Requests that don't raise are passed through unchanged."""
+        response = client.get("/ok")
+        assert response.status_code == 200
+        assert response.json() == {"status": "ok"}
+
+    def test_generic_error_logs_handle_errors_category(self, caplog):
+        """The category note added by handle_errors ends up in the API error log line."""
+        @handle_errors
+        def parse_price(value):
+            return float(value)
+
+        app = FastAPI()
+        register_exception_handlers(app)
+
+        @app.get("/price")
+        async def price():
+            return {"price": parse_price("gratis")}
+
+        with caplog.at_level(logging.ERROR, logger="ai_shopify_search.api.error_handlers"):
+            response = TestClient(app, raise_server_exceptions=False).get("/price")
+        assert response.status_code == 500
+        api_records = [r for r in caplog.records if r.name == "ai_shopify_search.api.error_handlers"]
+        logged = json.loads(api_records[0].args[0])
+        assert logged["error_type"] == "ValueError"
+        assert logged["error_category"] == "validation"
+
+    def test_search_api_exception_subclass_resolution(self):
+        """Subclasses not listed in the dispatch table resolve via their MRO."""
+        class CustomValidationError(ValidationError):
+            pass
+
+        app = FastAPI()
+        register_exception_handlers(app)
+
+        @app.get("/custom")
+        async def custom():
+            raise CustomValidationError("Custom")
+
+        response = TestClient(app).get("/custom")
+        assert response.status_code == 400
+        assert response.json()["error_code"] == "VALIDATION_ERROR"
+
+class TestValidateSearchParameters:
+    """Test validate_search_parameters."""
+
+    def test_valid_parameters(self):
+        """Valid parameters don't raise."""
+        validate_search_parameters("shoes", 1, 1)
+        validate_search_parameters("ab", 5, 100)
+
+    @pytest.mark.parametrize("query, page, limit, message", [
+        ("", 1, 10, "Search query cannot be empty"),
+        (None, 1, 10, "Search query cannot be empty"),
+        ("   ", 0, 0, "Search query cannot be empty"),
+        (" a ", 1, 10, "Search query must be at least 2 characters long"),
+        ("a", 0, 0, "Search query must be at least 2 characters long"),
+        ("shoes", 0, 10, "Page number must be greater than 0"),
+        ("shoes", -1, 500, "Page number must be greater than 0"),
+        ("shoes", 1, 0, "Limit must be between 1 and 100"),
+        ("shoes", 1, 101, "Limit must be between 1 and 100"),
+    ])
+    def test_first_failed_check_reported(self, query, page, limit, message):
+        """The first failing check (in declaration order) determines the message."""
+        with pytest.raises(ValidationError) as exc_info:
+            validate_search_parameters(query, page, limit)
+        assert exc_info.value.detail == message
+
+class TestDateValidation:
+    """Test _is_ymd and validate_analytics_parameters."""
+
+    @pytest.mark.parametrize("value", ["2024-01-31", "2024-02-29", "2000-02-29", "1999-12-31"])
+    def test_valid_dates(self, value):
+        """Real calendar dates are accepted, including leap days."""
+        assert _is_ymd(value)
+
+    @pytest.mark.parametrize("value", [
+        "2024-02-30",  # No such day
+        "2023-02-29",  # Not a leap year
+        "1900-02-29",  # Century, not a leap year
+        "2024-13-01",
+        "2024-00-10",
+        "0000-01-01",
+        "2024-1-01",
+        "2024/01/01",
+        "20240101",
+        "2024-01-01T00:00",
+        " 2024-01-01",
+        "2024-01-0a",
+        "",
+    ])
+    def test_invalid_dates(self, value):
+        """Impossible dates and other shapes are rejected."""
+        assert not _is_ymd(value)
+
+    def test_validate_analytics_parameters(self):
+        """Both dates must be valid."""
+        validate_analytics_parameters("2024-02-01", "2024-02-29")
+        with pytest.raises(ValidationError) as exc_info:
+            validate_analytics_parameters("2024-02-01", "2024-02-30")
+        assert exc_info.value.detail == "Invalid date format. Use YYYY-MM-DD"
+        with pytest.raises(ValidationError):
+            validate_analytics_parameters("2024-2-1", "2024-02-10")
@@ -10,7 +10,7 @@ from ai_shopify_search.utils.error_handling import (
     AuthenticationError, AuthorizationError, RateLimitError,
     CacheError, ExternalAPIError, SystemError,
     ErrorHandler, ErrorMonitor, ErrorSeverity, ErrorCategory,
-    handle_errors, retry_on_error, validate_input
+    handle_errors, retry_on_error, validate_input, category_from_notes
 )
 
 class TestBaseError:
@@ -177,12 +177,13 @@ class TestErrorHandler:
         assert handler.error_callbacks is not None
         assert handler.recovery_strategies is not None
     
-    def test_handle_error(self):
+    @pytest.mark.asyncio
+    async def test_handle_error(self):
         """Test error handling."""
         handler = ErrorHandler()
         error = ValidationError("Test error")
         
-        result = handler.handle_error(error)
+        result = await handler.handle_error(error)
         assert "error_id" in result
         assert "category" in result
         assert "recovery_attempted" in result
@@ -198,14 +199,15 @@ class TestErrorHandler:
         handler.register_error_callback(ErrorCategory.VALIDATION, test_callback)
         assert ErrorCategory.VALIDATION in handler.error_callbacks
     
-    def test_get_error_stats(self):
+    @pytest.mark.asyncio
+    async def test_get_error_stats(self):
         """Test getting error statistics."""
         handler = ErrorHandler()
         
         # Handle some errors
-        handler.handle_error(ValidationError("Error 1"))
-        handler.handle_error(DatabaseError("Error 2"))
-        handler.handle_error(ValidationError("Error 3"))
+        await handler.handle_error(ValidationError("Error 1"))
+        await handler.handle_error(DatabaseError("Error 2"))
+        await handler.handle_error(ValidationError("Error 3"))
         
         stats = handler.get_error_stats()
         assert "total_errors" in stats
@@ -213,6 +215,44 @@ class TestErrorHandler:
         assert "severities" in stats
         assert stats["total_errors"] == 3
 
+    @pytest.mark.asyncio
+    async def test_handle_error_retries_operation(self, monkeypatch):
+        """Test that a failing op is retried until it succeeds."""
+        async def no_sleep(delay):
+            pass
+        monkeypatch.setattr(asyncio, "sleep", no_sleep)
+        
+        calls = []
+        def flaky_op():
+            calls.append(1)
+            if len(calls) < 2:
+                raise ConnectionError("still down")
+        
+        handler = ErrorHandler()
+        error = NetworkError("Connection reset")
+        error.details["op"] = flaky_op
+        
+        result = await handler.handle_error(error)
+        assert len(calls) == 2
+        assert result["recovery_attempted"] is True
+        assert result["recovery_successful"] is True
+    
+    @pytest.mark.asyncio
+    async def test_handle_error_retry_exhausted(self, monkeypatch):
+        """Test that recovery fails when every retry fails (or there is no op)."""
+        async def no_sleep(delay):
+            pass
+        monkeypatch.setattr(asyncio, "sleep", no_sleep)
+        
+        def broken_op():
+            raise ConnectionError("down")
+        
+        handler = ErrorHandler()
+        error = NetworkError("Connection reset")
+        error.details["op"] = broken_op
+        assert (await handler.handle_error(error))["recovery_successful"] is False
+        assert (await handler.handle_error(NetworkError("No op")))["recovery_successful"] is False
+
 class TestErrorMonitor:
     """Test ErrorMonitor class."""
     
@@ -254,6 +294,27 @@ class TestDecorators:
         with pytest.raises(ValidationError):
             test_sync_func()
     
+    @pytest.mark.parametrize("error, category", [
+        (ValueError("bad price"), ErrorCategory.VALIDATION),
+        (TypeError("bad type"), ErrorCategory.VALIDATION),
+        (UnicodeDecodeError("utf-8", b"\xff", 0, 1, "invalid start byte"), ErrorCategory.VALIDATION),
+    ])
+    def test_handle_errors_plain_exception_category(self, error, category):
+        """Plain TypeError/ValueError (and subclasses) are re-raised with their category as a note."""
+        @handle_errors
+        def test_sync_func():
+            raise error
+        
+        with pytest.raises(type(error)) as exc_info:
+            test_sync_func()
+        assert exc_info.value is error
+        assert error.__notes__ == [f"error_category: {category.value} (in test_sync_func)"]
+        assert category_from_notes(error) == category
+    
+    def test_category_from_notes_without_note(self):
+        """Exceptions that never passed through handle_errors are UNKNOWN."""
+        assert category_from_notes(RuntimeError("boom")) == ErrorCategory.UNKNOWN
+    
     @pytest.mark.asyncio
     async def test_retry_on_error_decorator_async(self):
         """Test @retry_on_error decorator with async function."""
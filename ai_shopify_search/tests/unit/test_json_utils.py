@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for utils/json_utils.py with orjson and with the stdlib fallback.
+"""
+
+import json
+from datetime import datetime
+from enum import Enum
+
+import numpy as np
+import pytest
+
+from ai_shopify_search.utils import json_utils
+from ai_shopify_search.utils.json_utils import json_log, json_bytes, json_pretty
+
+
+class Color(Enum):
+    BLACK = "zwart"
+
+
+PAYLOAD = {
+    "query": "zwarte jurk",
+    ("store", 1): {"count": 2},                  # Tuple keys are stringified
+    3: "int key",
+    None: "none key",
+    True: "bool key",
+    datetime(2024, 3, 5, 13, 0): "datetime key",
+    Color.BLACK: Color.BLACK,
+    "nested": [{(0, 1): np.float64(0.5)}],
+    "scores": np.array([0.25, 0.75]),
+    "created_at": datetime(2024, 3, 5, 13, 0),
+}
+
+EXPECTED = {
+    "query": "zwarte jurk",
+    "('store', 1)": {"count": 2},
+    "3": "int key",
+    "null": "none key",
+    "true": "bool key",
+    "2024-03-05T13:00:00": "datetime key",
+    "zwart": "zwart",
+    "nested": [{"(0, 1)": 0.5}],
+    "scores": [0.25, 0.75],
+    "created_at": "2024-03-05T13:00:00",
+}
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def backend(request, monkeypatch):
+    """Run each test with orjson (when installed) and with the stdlib fallback."""
+    if request.param == "orjson":
+        if not json_utils.ORJSON_AVAILABLE:
+            pytest.skip("orjson not installed")
+    else:
+        monkeypatch.setattr(json_utils, "ORJSON_AVAILABLE", False)
+    return request.param
+
+
+class TestJsonLog:
+    """Test json_log."""
+
+    def test_non_str_keys(self, backend):
+        """Both paths write non-str keys (tuples included) the same way."""
+        line = json_log(PAYLOAD)
+        assert "\n" not in line
+        assert json.loads(line) == EXPECTED
+
+    def test_plain_payload(self, backend):
+        assert json.loads(json_log({"error_type": "ValueError", "count": 1})) == {"error_type": "ValueError", "count": 1}
+
+
+class TestJsonBytes:
+    """Test json_bytes."""
+
+    def test_compact(self, backend):
+        assert json_bytes({"endpoint": "/search", "context": None}) == b'{"endpoint":"/search","context":null}'
+
+    def test_unknown_values_as_str(self, backend):
+        assert json.loads(json_bytes({"error": ValueError("boom")})) == {"error": "boom"}
+
+
+class TestJsonPretty:
+    """Test json_pretty."""
+
+    def test_indented_numpy(self, backend):
+        data = {"regressions_detected": 1, "current_metrics": {"avg_relevance_score": np.float64(0.5)}}
+        pretty = json_pretty(data)
+        assert pretty.startswith(b'{\n  "regressions_detected": 1')
+        assert json.loads(pretty) == {"regressions_detected": 1, "current_metrics": {"avg_relevance_score": 0.5}}
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+SQLite tests for the dialect-variant column types (core/models.py) and the run-once migrations (core/migrations.py).
+"""
+
+import pytest
+from sqlalchemy import create_engine, MetaData, Table, Column, Integer, Text, select, insert, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+from ai_shopify_search.core.models import JSONEncodedList, ArrayType, TagsType, Product
+from ai_shopify_search.core.migrations import run_migrations, MIGRATIONS
+
+@pytest.fixture
+def engine():
+    """In-memory SQLite engine."""
+    engine = create_engine("sqlite://")
+    yield engine
+    engine.dispose()
+
+class TestListTypes:
+    """Test JSONEncodedList and the ArrayType/TagsType variants."""
+
+    @pytest.fixture
+    def items_table(self, engine):
+        metadata = MetaData()
+        table = Table(
+            "items", metadata,
+            Column("id", Integer, primary_key=True),
+            Column("tags", TagsType),
+            Column("payload", ArrayType),
+            Column("raw", JSONEncodedList),
+        )
+        metadata.create_all(engine)
+        return table
+
+    @pytest.mark.parametrize("tags, payload", [
+        (["zwart", "jurk", "store:demo"], [{"size": "M"}, 1.5, None]),
+        (["één", "€ 50"], {"nested": {"a": [1, 2]}}),
+        ([], []),
+    ])
+    def test_round_trip(self, engine, items_table, tags, payload):
+        """Lists (and JSON values) come back as Python objects, not JSON text."""
+        with engine.begin() as conn:
+            conn.execute(insert(items_table), {"id": 1, "tags": tags, "payload": payload, "raw": tags})
+            row = conn.execute(select(items_table)).one()
+        assert row.tags == tags
+        assert row.payload == payload
+        assert row.raw == tags
+
+    def test_stored_as_json_text(self, engine, items_table):
+        """On SQLite the value is plain JSON text in the column."""
+        with engine.begin() as conn:
+            conn.execute(insert(items_table), {"id": 1, "tags": ["a", "b"]})
+            stored = conn.execute(text("SELECT tags FROM items")).scalar()
+        assert stored == '["a", "b"]'
+
+    def test_null_round_trip(self, engine, items_table):
+        """None is stored as NULL and read back as None."""
+        with engine.begin() as conn:
+            conn.execute(insert(items_table), {"id": 1, "tags": None, "payload": None})
+            row = conn.execute(select(items_table)).one()
+            stored = conn.execute(text("SELECT tags, payload FROM items")).one()
+        assert row.tags is None and row.payload is None
+        assert tuple(stored) == (None, None)
+
+    def test_dialect_variants(self):
+        """PostgreSQL keeps the native types; SQLite gets TEXT."""
+        tags_type = Product.__table__.c.tags.type
+        assert tags_type.compile(dialect=postgresql.dialect()) == "TEXT[]"
+        assert tags_type.compile(dialect=sqlite.dialect()) == "TEXT"
+        assert ArrayType.compile(dialect=postgresql.dialect()) == "JSONB"
+        assert ArrayType.compile(dialect=sqlite.dialect()) == "TEXT"
+
+class TestMigrations:
+    """Test run_migrations on an old-style SQLite schema."""
+
+    @pytest.fixture
+    def legacy_engine(self, engine):
+        """Tables as they looked before day_epoch and embedding_fingerprint existed."""
+        with engine.begin() as conn:
+            conn.execute(text("""
+                CREATE TABLE benchmark_history (
+                    id INTEGER PRIMARY KEY, store_id VARCHAR, query VARCHAR, score FLOAT,
+                    response_time FLOAT, price_coherence FLOAT, timestamp DATETIME
+                )
+            """))
+            conn.execute(text("CREATE INDEX ix_benchmark_history_store_timestamp ON benchmark_history (store_id, timestamp)"))
+            conn.execute(text("""
+                INSERT INTO benchmark_history (store_id, query, score, timestamp) VALUES
+                ('demo', 'jurk', 0.8, '2024-03-05 13:00:00.000000'),
+                ('demo', 'jas', 0.7, '1970-01-02 00:00:00.000000'),
+                ('demo', 'broek', 0.6, NULL)
+            """))
+            conn.execute(text("CREATE TABLE products (id INTEGER PRIMARY KEY, tags TEXT)"))
+        return engine
+
+    def test_applies_each_migration_once(self, legacy_engine):
+        """A second run finds nothing to do."""
+        assert run_migrations(legacy_engine) == [name for name, _ in MIGRATIONS]
+        assert run_migrations(legacy_engine) == []
+
+    def test_benchmark_history_day_epoch(self, legacy_engine):
+        """day_epoch is backfilled from timestamp and the interim indexes are replaced."""
+        run_migrations(legacy_engine)
+        with legacy_engine.begin() as conn:
+            day_epochs = conn.execute(text("SELECT query, day_epoch FROM benchmark_history")).all()
+            indexes = set(conn.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'benchmark_history'"
+            )).scalars())
+        assert dict(day_epochs) == {"jurk": 19787, "jas": 1, "broek": None}
+        assert indexes == {"ix_benchmark_history_report"}
+
+    def test_products_embedding_fingerprint(self, legacy_engine):
+        """The fingerprint column is added to existing products tables."""
+        run_migrations(legacy_engine)
+        with legacy_engine.begin() as conn:
+            columns = {row[1] for row in conn.execute(text("PRAGMA table_info(products)"))}
+        assert "embedding_fingerprint" in columns
@@ -7,6 +7,7 @@ Contains utility functions organized in subpackages:
 - search: Search-related utilities
 - privacy: Privacy and data protection
 - error_handling: Error handling utilities
+- json_utils: JSON serialization (orjson when available)
 """
 
 from .validation import *
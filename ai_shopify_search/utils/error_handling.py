@@ -6,11 +6,18 @@ Comprehensive error handling system with custom exceptions and error recovery.
 import logging
 import traceback
 import asyncio
-from typing import Dict, Any, Optional, Callable, List
+import sys
+import time
+import random
+import inspect
+from collections import Counter
+from typing import Dict, Any, Optional, Callable, Set, Tuple
 from datetime import datetime
 from functools import wraps
 from enum import Enum
 
+from .json_utils import json_log
+
 logger = logging.getLogger(__name__)
 
 class ErrorSeverity(Enum):
@@ -19,6 +26,9 @@ class ErrorSeverity(Enum):
     MEDIUM = "medium"
     HIGH = "high"
     CRITICAL = "critical"
+    
+    # Members are singletons: identity hash (C-level) instead of Enum's hash(self._name_)
+    __hash__ = object.__hash__
 
 class ErrorCategory(Enum):
     """Error categories."""
@@ -32,10 +42,36 @@ class ErrorCategory(Enum):
     EXTERNAL_API = "external_api"
     SYSTEM = "system"
     UNKNOWN = "unknown"
+    
+    __hash__ = object.__hash__
+
+# (category, severity) -> (category string, severity string, stats key), built once
+_CAT_SEV_KEYS = {
+    (category, severity): (category.value, severity.value, f"{category.value}_{severity.value}")
+    for category in ErrorCategory
+    for severity in ErrorSeverity
+}
+
+# Upper-case category label used as the log line prefix
+_CATEGORY_LABELS = {category: category.value.upper() for category in ErrorCategory}
+
+# Log level per severity (see ErrorHandler._log_error)
+_SEVERITY_LOG_LEVELS = {
+    ErrorSeverity.CRITICAL: logging.CRITICAL,
+    ErrorSeverity.HIGH: logging.ERROR,
+    ErrorSeverity.MEDIUM: logging.WARNING,
+    ErrorSeverity.LOW: logging.INFO,
+}
 
 class BaseError(Exception):
     """Base error class for all custom exceptions."""
     
+    # Attributes live in slots, so raising an error doesn't allocate an instance __dict__
+    __slots__ = (
+        "message", "category", "severity", "details", "retryable",
+        "_created_at", "_handled_exception", "_traceback"
+    )
+    
     def __init__(
         self,
         message: str,
@@ -50,12 +86,32 @@ class BaseError(Exception):
         self.severity = severity
         self.details = details or {}
         self.retryable = retryable
-        self.timestamp = datetime.now()
-        self.traceback = traceback.format_exc()
+        # Cheap captures; formatting happens on first access (most errors are never inspected)
+        self._created_at = time.time()
+        self._handled_exception = sys.exc_info()[1]
+        self._traceback = None
+    
+    @property
+    def timestamp(self) -> datetime:
+        """Creation time of the error."""
+        return datetime.fromtimestamp(self._created_at)
+    
+    @property
+    def traceback(self) -> str:
+        """Traceback of the exception being handled when this error was created (as format_exc())."""
+        if self._traceback is None:
+            exc = self._handled_exception
+            self._traceback = (
+                "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+                if exc is not None else "NoneType: None\n"
+            )
+        return self._traceback
 
 class ValidationError(BaseError):
     """Validation error."""
     
+    __slots__ = ()
+    
     def __init__(self, message: str, field: Optional[str] = None, value: Any = None):
         super().__init__(
             message=message,
@@ -68,6 +124,8 @@ class ValidationError(BaseError):
 class DatabaseError(BaseError):
     """Database error."""
     
+    __slots__ = ()
+    
     def __init__(
         self,
         message: str,
@@ -86,6 +144,8 @@ class DatabaseError(BaseError):
 class NetworkError(BaseError):
     """Network error."""
     
+    __slots__ = ()
+    
     def __init__(self, message: str, url: Optional[str] = None, status_code: Optional[int] = None):
         super().__init__(
             message=message,
@@ -98,6 +158,8 @@ class NetworkError(BaseError):
 class AuthenticationError(BaseError):
     """Authentication error."""
     
+    __slots__ = ()
+    
     def __init__(self, message: str, user_id: Optional[str] = None):
         super().__init__(
             message=message,
@@ -110,6 +172,8 @@ class AuthenticationError(BaseError):
 class AuthorizationError(BaseError):
     """Authorization error."""
     
+    __slots__ = ()
+    
     def __init__(self, message: str, user_id: Optional[str] = None, resource: Optional[str] = None):
         super().__init__(
             message=message,
@@ -122,6 +186,8 @@ class AuthorizationError(BaseError):
 class RateLimitError(BaseError):
     """Rate limit error."""
     
+    __slots__ = ()
+    
     def __init__(self, message: str, retry_after: Optional[int] = None):
         super().__init__(
             message=message,
@@ -134,6 +200,8 @@ class RateLimitError(BaseError):
 class CacheError(BaseError):
     """Cache error."""
     
+    __slots__ = ()
+    
     def __init__(self, message: str, operation: Optional[str] = None, key: Optional[str] = None):
         super().__init__(
             message=message,
@@ -146,6 +214,8 @@ class CacheError(BaseError):
 class ExternalAPIError(BaseError):
     """External API error."""
     
+    __slots__ = ()
+    
     def __init__(
         self,
         message: str,
@@ -164,6 +234,8 @@ class ExternalAPIError(BaseError):
 class SystemError(BaseError):
     """System error."""
     
+    __slots__ = ()
+    
     def __init__(self, message: str, component: Optional[str] = None):
         super().__init__(
             message=message,
@@ -176,10 +248,21 @@ class SystemError(BaseError):
 class ErrorHandler:
     """Centralized error handler with recovery strategies."""
     
+    # Pending stats are merged into error_stats every N errors or T seconds (and on get_error_stats)
+    STATS_FLUSH_EVERY = 64
+    STATS_FLUSH_INTERVAL = 5.0
+    
     def __init__(self):
-        self.error_callbacks: Dict[ErrorCategory, List[Callable]] = {}
+        # Tuples: registration is rare, iteration happens on every error
+        self.error_callbacks: Dict[ErrorCategory, Tuple[Callable, ...]] = {}
         self.recovery_strategies: Dict[ErrorCategory, Callable] = {}
-        self.error_stats: Dict[str, int] = {}
+        # Keyed by (ErrorCategory, ErrorSeverity); get_error_stats renders the string keys
+        self.error_stats: Counter = Counter()
+        self._pending_stats: Counter = Counter()
+        self._categories_seen: Set[ErrorCategory] = set()
+        self._severities_seen: Set[ErrorSeverity] = set()
+        self._pending_count = 0
+        self._last_stats_flush = time.monotonic()
         self._setup_default_strategies()
     
     def _setup_default_strategies(self):
@@ -199,14 +282,15 @@ class ErrorHandler:
     
     def register_error_callback(self, category: ErrorCategory, callback: Callable):
         """Register a callback for specific error categories."""
-        if category not in self.error_callbacks:
-            self.error_callbacks[category] = []
-        self.error_callbacks[category].append(callback)
+        self.error_callbacks[category] = self.error_callbacks.get(category, ()) + (callback,)
     
-    def handle_error(self, error: BaseError) -> Dict[str, Any]:
+    async def handle_error(self, error: BaseError) -> Dict[str, Any]:
         """
         Handle an error with appropriate logging and recovery.
         
+        Recovery strategies are awaited, so a retryable error with a
+        details["op"] is really retried before this returns.
+        
         Args:
             error: The error to handle
             
@@ -214,22 +298,16 @@ class ErrorHandler:
             Error handling result
         """
         try:
-            # Log error
-            self._log_error(error)
-            
-            # Update statistics
-            self._update_error_stats(error)
-            
-            # Execute callbacks
-            self._execute_callbacks(error)
+            self.record_error(error)
             
             # Attempt recovery
-            recovery_result = self._attempt_recovery(error)
+            recovery_result = await self._attempt_recovery(error)
             
+            category, severity, _ = _CAT_SEV_KEYS[(error.category, error.severity)]
             return {
                 "error_id": id(error),
-                "category": error.category.value,
-                "severity": error.severity.value,
+                "category": category,
+                "severity": severity,
                 "retryable": error.retryable,
                 "recovery_attempted": recovery_result["attempted"],
                 "recovery_successful": recovery_result["successful"],
@@ -237,65 +315,115 @@ class ErrorHandler:
             }
             
         except Exception as e:
-            logger.error(f"Error in error handler: {e}")
+            logger.error("Error in error handler: %s", e)
             return {"error": "Error handler failed"}
     
+    def record_error(self, error: BaseError):
+        """Log, count and run callbacks for an error, without recovery (usable from sync code)."""
+        # Log error
+        self._log_error(error)
+        
+        # Update statistics
+        self._update_error_stats(error)
+        
+        # Execute callbacks
+        self._execute_callbacks(error)
+    
+    def handle_exception(self, error: Exception, severity: ErrorSeverity = ErrorSeverity.MEDIUM):
+        """
+        Log and count a plain (non-BaseError) exception.
+        
+        The category comes from the exception's notes (see handle_errors); no
+        callbacks or recovery run since there is no BaseError metadata.
+        """
+        category = category_from_notes(error)
+        level = _SEVERITY_LOG_LEVELS.get(severity, logging.INFO)
+        if logger.isEnabledFor(level):
+            logger.log(level, "%s ERROR: %s: %s", _CATEGORY_LABELS[category], type(error).__name__, error)
+        self._count_error(category, severity)
+    
     def _log_error(self, error: BaseError):
         """Log error with appropriate level."""
-        log_message = f"{error.category.value.upper()} ERROR: {error.message}"
+        level = _SEVERITY_LOG_LEVELS.get(error.severity, logging.INFO)
+        # Don't build the message (or repr the details) for records that would be dropped
+        if not logger.isEnabledFor(level):
+            return
         
         if error.details:
-            log_message += f" | Details: {error.details}"
-        
-        if error.severity == ErrorSeverity.CRITICAL:
-            logger.critical(log_message)
-        elif error.severity == ErrorSeverity.HIGH:
-            logger.error(log_message)
-        elif error.severity == ErrorSeverity.MEDIUM:
-            logger.warning(log_message)
+            logger.log(level, "%s ERROR: %s | Details: %s", _CATEGORY_LABELS[error.category], error.message, json_log(error.details))
         else:
-            logger.info(log_message)
+            logger.log(level, "%s ERROR: %s", _CATEGORY_LABELS[error.category], error.message)
     
     def _update_error_stats(self, error: BaseError):
         """Update error statistics."""
-        category_key = f"{error.category.value}_{error.severity.value}"
-        self.error_stats[category_key] = self.error_stats.get(category_key, 0) + 1
+        self._count_error(error.category, error.severity)
+    
+    def _count_error(self, category: ErrorCategory, severity: ErrorSeverity):
+        """Count one error under its category/severity key."""
+        self._pending_stats[(category, severity)] += 1
+        self._categories_seen.add(category)
+        self._severities_seen.add(severity)
+        self._pending_count += 1
+        if (self._pending_count >= self.STATS_FLUSH_EVERY
+                or time.monotonic() - self._last_stats_flush >= self.STATS_FLUSH_INTERVAL):
+            self._flush_error_stats()
+    
+    def _flush_error_stats(self):
+        """Merge pending error counts into error_stats."""
+        if self._pending_count:
+            self.error_stats.update(self._pending_stats)
+            self._pending_stats.clear()
+            self._pending_count = 0
+        self._last_stats_flush = time.monotonic()
     
     def _execute_callbacks(self, error: BaseError):
         """Execute registered callbacks for the error category."""
-        if error.category in self.error_callbacks:
-            for callback in self.error_callbacks[error.category]:
-                try:
-                    callback(error)
-                except Exception as e:
-                    logger.error(f"Error in error callback: {e}")
+        for callback in self.error_callbacks.get(error.category, ()):
+            try:
+                callback(error)
+            except Exception as e:
+                logger.error("Error in error callback: %s", e)
     
-    def _attempt_recovery(self, error: BaseError) -> Dict[str, bool]:
-        """Attempt error recovery using registered strategies."""
+    async def _attempt_recovery(self, error: BaseError) -> Dict[str, bool]:
+        """Attempt error recovery using registered (sync or async) strategies."""
         if not error.retryable or error.category not in self.recovery_strategies:
             return {"attempted": False, "successful": False}
         
         try:
             strategy = self.recovery_strategies[error.category]
             result = strategy(error)
-            return {"attempted": True, "successful": result}
+            if inspect.isawaitable(result):
+                result = await result
+            return {"attempted": True, "successful": bool(result)}
         except Exception as e:
-            logger.error(f"Recovery strategy failed: {e}")
+            logger.error("Recovery strategy failed: %s", e)
             return {"attempted": True, "successful": False}
     
     async def _retry_with_backoff(self, error: BaseError) -> bool:
-        """Retry operation with exponential backoff."""
+        """
+        Retry the failed operation with jittered exponential backoff.
+        
+        The operation is passed as a (sync or async) callable in error.details["op"];
+        without one there is nothing to retry. Jitter keeps workers that failed
+        together (e.g. on a DB outage) from reconnecting in lockstep.
+        """
+        operation = error.details.get("op")
+        if operation is None:
+            return False
+        
         max_retries = 3
-        base_delay = 1.0
+        delay = 1.0
         
         for attempt in range(max_retries):
+            await asyncio.sleep(random.uniform(0.5, 1.5) * delay)
             try:
-                await asyncio.sleep(base_delay * (2 ** attempt))
-                # Here you would retry the original operation
-                # For now, we'll just return True to simulate success
+                result = operation()
+                if inspect.isawaitable(result):
+                    await result
                 return True
             except Exception as e:
-                logger.warning(f"Retry attempt {attempt + 1} failed: {e}")
+                logger.warning("Retry attempt %d failed: %s", attempt + 1, e)
+            delay *= 2
         
         return False
     
@@ -306,7 +434,7 @@ class ErrorHandler:
             logger.info("Falling back to database due to cache error")
             return True
         except Exception as e:
-            logger.error(f"Database fallback failed: {e}")
+            logger.error("Database fallback failed: %s", e)
             return False
     
     async def _wait_and_retry(self, error: BaseError) -> bool:
@@ -316,89 +444,109 @@ class ErrorHandler:
             await asyncio.sleep(retry_after)
             return True
         except Exception as e:
-            logger.error(f"Wait and retry failed: {e}")
+            logger.error("Wait and retry failed: %s", e)
             return False
     
     def get_error_stats(self) -> Dict[str, Any]:
         """Get error statistics."""
+        self._flush_error_stats()
         return {
-            "error_counts": self.error_stats,
+            "error_counts": {_CAT_SEV_KEYS[key][2]: count for key, count in self.error_stats.items()},
             "total_errors": sum(self.error_stats.values()),
-            "categories": list(set(key.split("_")[0] for key in self.error_stats.keys())),
-            "severities": list(set(key.split("_")[1] for key in self.error_stats.keys()))
+            "categories": [category.value for category in self._categories_seen],
+            "severities": [severity.value for severity in self._severities_seen]
         }
 
 # Global error handler instance
 error_handler = ErrorHandler()
 
+# Plain exceptions handle_errors records without wrapping (with their category); anything else propagates untouched
+_EXCEPTION_CATEGORIES = {
+    TypeError: ErrorCategory.VALIDATION,
+    ValueError: ErrorCategory.VALIDATION,
+}
+_ANNOTATED_EXCEPTIONS = tuple(_EXCEPTION_CATEGORIES)
+_CATEGORY_NOTE_PREFIX = "error_category: "
+
+def _exception_category(error: Exception) -> ErrorCategory:
+    """Category of a plain exception (most specific class in the MRO wins)."""
+    for klass in type(error).__mro__:
+        category = _EXCEPTION_CATEGORIES.get(klass)
+        if category is not None:
+            return category
+    return ErrorCategory.UNKNOWN
+
+def _annotate_and_record(error: Exception, function_name: str):
+    """Tag a plain exception with its category (PEP 678 note) and record it, keeping the original traceback."""
+    error.add_note(f"{_CATEGORY_NOTE_PREFIX}{_exception_category(error).value} (in {function_name})")
+    error_handler.handle_exception(error)
+
+def category_from_notes(error: Exception) -> ErrorCategory:
+    """Error category attached by handle_errors, UNKNOWN if there is none."""
+    for note in getattr(error, "__notes__", ()):
+        if note.startswith(_CATEGORY_NOTE_PREFIX):
+            try:
+                return ErrorCategory(note[len(_CATEGORY_NOTE_PREFIX):].split(" ", 1)[0])
+            except ValueError:
+                break
+    return ErrorCategory.UNKNOWN
+
 def handle_errors(func):
     """Decorator to automatically handle errors in functions."""
-    @wraps(func)
-    async def async_wrapper(*args, **kwargs):
-        try:
-            return await func(*args, **kwargs)
-        except BaseError as e:
-            error_handler.handle_error(e)
-            raise
-        except Exception as e:
-            # Convert generic exceptions to BaseError
-            base_error = BaseError(
-                message=str(e),
-                category=ErrorCategory.UNKNOWN,
-                severity=ErrorSeverity.MEDIUM,
-                details={"function": func.__name__},
-                retryable=False
-            )
-            error_handler.handle_error(base_error)
-            raise base_error
+    if asyncio.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except BaseError as e:
+                # Re-raised to the caller, so only record it; recovery belongs to whoever handles it
+                error_handler.record_error(e)
+                raise
+            except _ANNOTATED_EXCEPTIONS as e:
+                _annotate_and_record(e, func.__name__)
+                raise
+        
+        return async_wrapper
     
     @wraps(func)
     def sync_wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
         except BaseError as e:
-            error_handler.handle_error(e)
+            error_handler.record_error(e)
+            raise
+        except _ANNOTATED_EXCEPTIONS as e:
+            _annotate_and_record(e, func.__name__)
             raise
-        except Exception as e:
-            # Convert generic exceptions to BaseError
-            base_error = BaseError(
-                message=str(e),
-                category=ErrorCategory.UNKNOWN,
-                severity=ErrorSeverity.MEDIUM,
-                details={"function": func.__name__},
-                retryable=False
-            )
-            error_handler.handle_error(base_error)
-            raise base_error
     
-    if asyncio.iscoroutinefunction(func):
-        return async_wrapper
-    else:
-        return sync_wrapper
+    return sync_wrapper
 
 def retry_on_error(max_retries: int = 3, delay: float = 1.0):
     """Decorator to retry operations on specific errors."""
     def decorator(func):
-        @wraps(func)
-        async def async_wrapper(*args, **kwargs):
-            last_exception = None
-            
-            for attempt in range(max_retries):
-                try:
-                    return await func(*args, **kwargs)
-                except BaseError as e:
-                    last_exception = e
-                    if e.retryable and attempt < max_retries - 1:
-                        logger.warning(f"Retrying {func.__name__} (attempt {attempt + 1}/{max_retries}): {e.message}")
-                        await asyncio.sleep(delay * (2 ** attempt))
-                    else:
-                        break
-                except Exception as e:
-                    # Don't retry on non-BaseError exceptions
-                    raise e
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                last_exception = None
+                
+                for attempt in range(max_retries):
+                    try:
+                        return await func(*args, **kwargs)
+                    except BaseError as e:
+                        last_exception = e
+                        if e.retryable and attempt < max_retries - 1:
+                            logger.warning("Retrying %s (attempt %d/%d): %s", func.__name__, attempt + 1, max_retries, e.message)
+                            await asyncio.sleep(delay * (2 ** attempt))
+                        else:
+                            break
+                    except Exception as e:
+                        # Don't retry on non-BaseError exceptions
+                        raise e
+                
+                if last_exception:
+                    raise last_exception
             
-            if last_exception:
-                raise last_exception
+            return async_wrapper
         
         @wraps(func)
         def sync_wrapper(*args, **kwargs):
@@ -410,8 +558,7 @@ def retry_on_error(max_retries: int = 3, delay: float = 1.0):
                 except BaseError as e:
                     last_exception = e
                     if e.retryable and attempt < max_retries - 1:
-                        logger.warning(f"Retrying {func.__name__} (attempt {attempt + 1}/{max_retries}): {e.message}")
-                        import time
+                        logger.warning("Retrying %s (attempt %d/%d): %s", func.__name__, attempt + 1, max_retries, e.message)
                         time.sleep(delay * (2 ** attempt))
                     else:
                         break
@@ -422,23 +569,23 @@ def retry_on_error(max_retries: int = 3, delay: float = 1.0):
             if last_exception:
                 raise last_exception
         
-        if asyncio.iscoroutinefunction(func):
-            return async_wrapper
-        else:
-            return sync_wrapper
+        return sync_wrapper
     
     return decorator
 
 def validate_input(validation_func: Callable):
     """Decorator to validate function inputs."""
     def decorator(func):
-        @wraps(func)
-        async def async_wrapper(*args, **kwargs):
-            try:
-                validation_func(*args, **kwargs)
-                return await func(*args, **kwargs)
-            except Exception as e:
-                raise ValidationError(f"Input validation failed: {e}")
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                try:
+                    validation_func(*args, **kwargs)
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    raise ValidationError(f"Input validation failed: {e}")
+            
+            return async_wrapper
         
         @wraps(func)
         def sync_wrapper(*args, **kwargs):
@@ -448,10 +595,7 @@ def validate_input(validation_func: Callable):
             except Exception as e:
                 raise ValidationError(f"Input validation failed: {e}")
         
-        if asyncio.iscoroutinefunction(func):
-            return async_wrapper
-        else:
-            return sync_wrapper
+        return sync_wrapper
     
     return decorator
 
@@ -465,13 +609,14 @@ class ErrorMonitor:
             ErrorSeverity.HIGH: 5,
             ErrorSeverity.MEDIUM: 10
         }
-        self.error_counts = {}
+        # Not batched: the alert threshold needs the exact running count
+        self.error_counts: Counter = Counter()
     
     def check_alerts(self, error: BaseError):
         """Check if an alert should be sent for this error."""
-        severity_key = f"{error.category.value}_{error.severity.value}"
-        current_count = self.error_counts.get(severity_key, 0) + 1
-        self.error_counts[severity_key] = current_count
+        severity_key = _CAT_SEV_KEYS[(error.category, error.severity)][2]
+        self.error_counts[severity_key] += 1
+        current_count = self.error_counts[severity_key]
         
         threshold = self.alert_thresholds.get(error.severity, float('inf'))
         
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+JSON serialization helpers shared by logging, error responses and report files.
+
+orjson is used when installed; the stdlib fallback produces the same values.
+"""
+
+import json
+from datetime import date, datetime, time
+from enum import Enum
+from typing import Any
+
+# orjson is optional (falls back to stdlib json)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+if ORJSON_AVAILABLE:
+    _LOG_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    _PRETTY_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+
+def _default(obj: Any) -> Any:
+    """Values neither serializer handles natively: numpy via tolist(), anything else as str."""
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    return str(obj)
+
+def _key(key: Any) -> str:
+    """Dict key as OPT_NON_STR_KEYS writes it; other types (tuples, ...) become str(key)."""
+    if isinstance(key, str):
+        return key
+    if key is None:
+        return "null"
+    if isinstance(key, bool):
+        return "true" if key else "false"
+    if isinstance(key, (datetime, date, time)):
+        return key.isoformat()
+    if isinstance(key, Enum):
+        return _key(key.value)
+    return str(key)
+
+def _str_keys(data: Any) -> Any:
+    """Copy of data with every dict key (at any depth) converted to str."""
+    if isinstance(data, dict):
+        return {_key(key): _str_keys(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [_str_keys(value) for value in data]
+    return data
+
+def json_log(data: Any) -> str:
+    """Serialize a log payload as one machine-parseable JSON line (non-str keys allowed)."""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(data, default=_default, option=_LOG_OPTIONS).decode()
+        except TypeError:
+            # Keys OPT_NON_STR_KEYS rejects (tuples); stringify them first
+            return orjson.dumps(_str_keys(data), default=_default, option=_LOG_OPTIONS).decode()
+    return json.dumps(_str_keys(data), default=_default)
+
+def json_bytes(data: Any) -> bytes:
+    """Serialize a response fragment to compact JSON bytes."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, default=_default)
+    return json.dumps(data, default=_default, separators=(",", ":")).encode()
+
+def json_pretty(data: Any) -> bytes:
+    """Serialize a report (e.g. a regression alert file) as indented JSON bytes."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, default=_default, option=_PRETTY_OPTIONS)
+    return json.dumps(data, default=_default, indent=2).encode()